@@ -0,0 +1,64 @@
+import argparse
+import random
+import time
+
+from title_matcher import TitleMatcher
+
+SUBJECTS = ["CS", "MATH", "ECON", "PHYS", "CHEM", "STAT", "ENGL", "PSYCH", "BIOL", "ECE",
+            "SE", "ME", "CO", "PMATH", "AMATH", "HIST", "PHIL", "SPCOM", "GEOG", "MUSIC"]
+
+
+def course_code(rng):
+    return f"{rng.choice(SUBJECTS)} {rng.randint(100, 499)}{rng.choice(['', '', '', 'A', 'B'])}"
+
+
+def event_title(rng):
+    return (f"{course_code(rng)} {rng.choice(['LEC', 'TUT', 'LAB'])} {rng.randint(1, 9):03d} "
+            f"- {rng.choice(['MC', 'DC', 'E7', 'STC'])} {rng.randint(1000, 4999)}")
+
+
+def contains_target_strings(event_title, target_strings):
+    """The per-event check caldelete-name.py used before TitleMatcher"""
+    if not event_title:
+        return False
+
+    event_title_lower = event_title.lower()
+    for target_string in target_strings:
+        if target_string.lower() in event_title_lower:
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time title matching with many course-code patterns.")
+    parser.add_argument("--titles", type=int, default=50_000)
+    parser.add_argument("--patterns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = [event_title(rng) for _ in range(args.titles)]
+    codes = sorted({course_code(rng) for _ in range(20 * max(args.patterns))})
+
+    print(f"{args.titles:,} titles")
+    for count in args.patterns:
+        patterns = rng.sample(codes, count)
+
+        start = time.perf_counter()
+        old = [contains_target_strings(title, patterns) for title in titles]
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = TitleMatcher(patterns)
+        build_time = time.perf_counter() - start
+        new = [matcher.match(title) is not None for title in titles]
+        new_time = time.perf_counter() - start - build_time
+
+        assert old == new, "matchers disagree"
+        print(f"{count:5d} patterns: per-pattern loop {old_time:7.3f}s, "
+              f"TitleMatcher {new_time:6.3f}s (+{build_time:.3f}s to build), "
+              f"{old_time / new_time:5.1f}x, {sum(new):,} matches")
+
+
+if __name__ == "__main__":
+    main()
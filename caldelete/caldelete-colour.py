@@ -1,12 +1,17 @@
 from __future__ import print_function
 
+import argparse
 import os.path
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 
+from calendar_events import (CHECKPOINT_FILE, DELETE_RATE, WORKERS, DeleteExecutor,
+                             load_checkpoint, print_delete_report)
+from event_index import INDEX_FILE, EventIndex
+
 # If modifying scopes, delete the existing token.json
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
@@ -29,51 +34,89 @@ def get_creds():
     return creds
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Delete calendar events of some colours that start after a cutoff date.")
+    parser.add_argument("--cutoff", type=date.fromisoformat, default=date(2025, 8, 20),
+                        help="delete events starting after this date (YYYY-MM-DD, default 2025-08-20)")
+    parser.add_argument("--colour", nargs="+", default=["default"], metavar="COLOUR",
+                        help="colour ids to delete (1-11), 'default' for events without a colour, or 'any'")
+    parser.add_argument("--instances", action="store_true",
+                        help="expand recurring events and delete matching instances instead of whole series")
+    parser.add_argument("--index", default=INDEX_FILE, metavar="FILE",
+                        help=f"local copy of the calendar, synced incrementally (default {INDEX_FILE})")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="download the whole calendar again instead of only the changes")
+    parser.add_argument("--rate", type=float, default=DELETE_RATE,
+                        help=f"deletes per second, shared by all workers (default {DELETE_RATE})")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"deletes in flight at once (default {WORKERS})")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"finish the deletes left in {CHECKPOINT_FILE} by an interrupted run, without listing again")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     creds = get_creds()
     service = build("calendar", "v3", credentials=creds)
 
     CALENDAR_ID = "primary"
 
-    # Set the cutoff date (August 20, 2025)
-    cutoff_date = datetime(2025, 8, 20)
+    if args.resume:
+        checkpoint = load_checkpoint(CHECKPOINT_FILE)
+        if checkpoint is None:
+            print(f"Nothing to resume: {CHECKPOINT_FILE} not found.")
+            return
+        calendar_id, events = checkpoint
+        print(f"Resuming: {len(events)} events left to delete.")
+        executor = DeleteExecutor(service, calendar_id, creds, rate=args.rate, workers=args.workers)
+        deleted, failed = executor.run(events)
+        print_delete_report(deleted, failed, executor)
+        EventIndex(args.index, calendar_id, expanded=args.instances).remove(event['id'] for event in deleted)
+        return
+
+    cutoff_date = datetime.combine(args.cutoff, datetime.min.time())
+    colour_desc = " or ".join(args.colour) + " colour"
 
-    # Get all events from the calendar
-    events_result = service.events().list(calendarId=CALENDAR_ID).execute()
-    events = events_result.get("items", [])
+    # Bring the local copy up to date; the colour and date filters run
+    # against it and only the deletes go to the API
+    index = EventIndex(args.index, CALENDAR_ID, expanded=args.instances)
+    updated, removed = index.sync(service, full=args.full_sync)
+    print(f"Synced {args.index}: {updated} events updated, {removed} removed, {len(index)} in total")
 
-    # Filter events that have default color AND are after August 20, 2025
-    default_color_events = []
+    # The index narrows by colour and start (from a day early, since the
+    # start times below are compared as local wall time); the exact check
+    # stays below
+    events = index.events(start_min=(args.cutoff - timedelta(days=1)).isoformat(), colours=args.colour)
+
+    # Keep events that start after the cutoff
+    matching_events = []
     for event in events:
-        # Check if event has default color (no colorId specified or colorId is None)
-        if 'colorId' not in event or event.get('colorId') is None:
-            # Check if event is after August 20, 2025
-            event_start = event.get('start', {})
-            if 'dateTime' in event_start:
-                # Event has specific time
-                event_datetime = datetime.fromisoformat(
-                    event_start['dateTime'].replace('Z', '+00:00'))
-                event_date = event_datetime.replace(tzinfo=None)
-            elif 'date' in event_start:
-                # All-day event
-                event_date = datetime.strptime(event_start['date'], '%Y-%m-%d')
-            else:
-                # Skip events without start date
-                continue
-
-            if event_date > cutoff_date:
-                default_color_events.append(event)
-
-    if not default_color_events:
-        print("No events with default color found after August 20, 2025.")
+        event_start = event.get('start', {})
+        if 'dateTime' in event_start:
+            # Event has specific time
+            event_datetime = datetime.fromisoformat(
+                event_start['dateTime'].replace('Z', '+00:00'))
+            event_date = event_datetime.replace(tzinfo=None)
+        elif 'date' in event_start:
+            # All-day event
+            event_date = datetime.strptime(event_start['date'], '%Y-%m-%d')
+        else:
+            # Skip events without start date
+            continue
+
+        if event_date > cutoff_date:
+            matching_events.append(event)
+
+    if not matching_events:
+        print(f"No events with {colour_desc} found after {args.cutoff}.")
     else:
         print(
-            f"Found {len(default_color_events)} events with default color after August 20, 2025.")
-        for event in default_color_events:
-            service.events().delete(calendarId=CALENDAR_ID,
-                                    eventId=event["id"]).execute()
-            event_title = event.get('summary', 'No title')
-            print(f"Deleted: {event_title} ({event['id']})")
+            f"Found {len(matching_events)} events with {colour_desc} after {args.cutoff}.")
+        executor = DeleteExecutor(service, CALENDAR_ID, creds, rate=args.rate, workers=args.workers)
+        deleted, failed = executor.run(matching_events)
+        print_delete_report(deleted, failed, executor)
+        index.remove(event['id'] for event in deleted)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,18 @@
 from __future__ import print_function
 
+import argparse
 import os.path
-from datetime import datetime
+from datetime import datetime, timedelta
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 
+from calendar_events import (CHECKPOINT_FILE, DELETE_RATE, WORKERS, DeleteExecutor,
+                             load_checkpoint, print_delete_report)
+from event_index import INDEX_FILE, EventIndex
+from title_matcher import TitleMatcher, load_patterns
+
 # If modifying scopes, delete the existing token.json
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
@@ -36,107 +42,116 @@ def get_creds():
     return creds
 
 
-def contains_target_strings(event_title, target_strings):
-    """Check if event title contains any of the target strings (case-insensitive)"""
-    if not event_title:
-        return False
-    
-    event_title_lower = event_title.lower()
-    for target_string in target_strings:
-        if target_string.lower() in event_title_lower:
-            return True
-    return False
-
-
-def list_events_on_date(service, calendar_id, target_date):
+def list_events_on_date(index, target_date, matcher):
     """List all events on a specific date for debugging purposes"""
     print(f"\n=== DEBUG: All events on {target_date} ===")
     
-    # Create time range for the specific date
-    start_time = f"{target_date}T00:00:00Z"
-    end_time = f"{target_date}T23:59:59Z"
-    
-    try:
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=start_time,
-            timeMax=end_time,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        if not events:
-            print(f"No events found on {target_date}")
-        else:
-            print(f"Found {len(events)} events on {target_date}:")
-            for i, event in enumerate(events, 1):
-                title = event.get('summary', 'No title')
-                start = event.get('start', {})
-                
-                if 'dateTime' in start:
-                    start_time = datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00'))
-                    time_str = start_time.strftime('%H:%M')
-                elif 'date' in start:
-                    time_str = 'All day'
-                else:
-                    time_str = 'No time'
-                
-                print(f"  {i}. {title} ({time_str})")
-                print(f"     Event ID: {event.get('id', 'No ID')}")
-                
-                # Check if this event would match our search criteria
-                if contains_target_strings(title, STRINGS_TO_DELETE):
-                    print(f"     *** MATCHES search criteria! ***")
-                else:
-                    print(f"     Does not match search criteria")
-                print()
+    # Events starting on that date, from the local index
+    next_date = (datetime.strptime(target_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    events = index.events(start_min=target_date, start_max=next_date)
     
-    except Exception as e:
-        print(f"Error fetching events for {target_date}: {e}")
+    if not events:
+        print(f"No events found on {target_date}")
+    else:
+        print(f"Found {len(events)} events on {target_date}:")
+        for i, event in enumerate(events, 1):
+            title = event.get('summary', 'No title')
+            start = event.get('start', {})
+            
+            if 'dateTime' in start:
+                start_time = datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00'))
+                time_str = start_time.strftime('%H:%M')
+            elif 'date' in start:
+                time_str = 'All day'
+            else:
+                time_str = 'No time'
+            
+            print(f"  {i}. {title} ({time_str})")
+            print(f"     Event ID: {event.get('id', 'No ID')}")
+            
+            # Check if this event would match our search criteria
+            pattern = matcher.match(title)
+            if pattern:
+                print(f"     *** MATCHES search criteria ({pattern})! ***")
+            else:
+                print(f"     Does not match search criteria")
+            print()
     
     print("=== END DEBUG ===\n")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Delete calendar events whose titles contain any of a list of strings.")
+    parser.add_argument("--patterns", metavar="FILE",
+                        help="file with one string per line (# comments allowed), instead of STRINGS_TO_DELETE")
+    parser.add_argument("--index", default=INDEX_FILE, metavar="FILE",
+                        help=f"local copy of the calendar, synced incrementally (default {INDEX_FILE})")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="download the whole calendar again instead of only the changes")
+    parser.add_argument("--rate", type=float, default=DELETE_RATE,
+                        help=f"deletes per second, shared by all workers (default {DELETE_RATE})")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"deletes in flight at once (default {WORKERS})")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"finish the deletes left in {CHECKPOINT_FILE} by an interrupted run, without listing again")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     creds = get_creds()
     service = build("calendar", "v3", credentials=creds)
 
     CALENDAR_ID = "primary"
 
-    print(f"Searching for events containing any of these strings: {STRINGS_TO_DELETE}")
+    if args.resume:
+        checkpoint = load_checkpoint(CHECKPOINT_FILE)
+        if checkpoint is None:
+            print(f"Nothing to resume: {CHECKPOINT_FILE} not found.")
+            return
+        calendar_id, events = checkpoint
+        print(f"Resuming: {len(events)} events left to delete.")
+        executor = DeleteExecutor(service, calendar_id, creds, rate=args.rate, workers=args.workers)
+        deleted, failed = executor.run(events)
+        print_delete_report(deleted, failed, executor)
+        EventIndex(args.index, calendar_id, expanded=True).remove(event['id'] for event in deleted)
+        return
+
+    # Bring the local copy up to date; everything up to the deletes is
+    # answered from it
+    index = EventIndex(args.index, CALENDAR_ID, expanded=True)
+    updated, removed = index.sync(service, full=args.full_sync)
+    print(f"Synced {args.index}: {updated} events updated, {removed} removed, {len(index)} in total")
+
+    # Build the matcher once; it is applied to every event below
+    patterns = load_patterns(args.patterns) if args.patterns else STRINGS_TO_DELETE
+    matcher = TitleMatcher(patterns)
+
+    if len(patterns) <= 10:
+        print(f"Searching for events containing any of these strings: {patterns}")
+    else:
+        print(f"Searching for events containing any of {len(patterns)} strings from {args.patterns}")
     print("=" * 50)
 
     # Debug: List all events on October 20, 2025
-    list_events_on_date(service, CALENDAR_ID, "2025-10-20")
+    list_events_on_date(index, "2025-10-20", matcher)
 
-    # Get all events from the calendar with a proper time range
-    # Set a wide time range to capture all events (past and future)
-    from datetime import datetime, timedelta
-    
-    # Get events from 1 year ago to 2 years in the future
+    # Search events from 1 year ago to 2 years in the future
     time_min = (datetime.now() - timedelta(days=365)).isoformat() + 'Z'
     time_max = (datetime.now() + timedelta(days=730)).isoformat() + 'Z'
     
     print(f"Searching events from {time_min} to {time_max}")
     
-    events_result = service.events().list(
-        calendarId=CALENDAR_ID,
-        timeMin=time_min,
-        timeMax=time_max,
-        singleEvents=True,
-        orderBy='startTime',
-        maxResults=2500  # Increase max results
-    ).execute()
-    events = events_result.get("items", [])
+    events = index.events(start_min=time_min, start_max=time_max)
 
     # Filter events that contain any of the target strings
     matching_events = []
+    matched_pattern = {}
     for event in events:
-        event_title = event.get('summary', '')
-        if contains_target_strings(event_title, STRINGS_TO_DELETE):
+        pattern = matcher.match(event.get('summary', ''))
+        if pattern:
             matching_events.append(event)
+            matched_pattern[event['id']] = pattern
 
     if not matching_events:
         print("No events found containing the specified strings.")
@@ -159,27 +174,17 @@ def main():
             else:
                 date_str = 'No date'
             
-            print(f"- {event_title} ({date_str})")
+            print(f"- {event_title} ({date_str}) [{matched_pattern[event['id']]}]")
         
         print()
         confirmation = input("Do you want to delete these events? (y/N): ")
         
         if confirmation.lower() in ['y', 'yes']:
             print("\nDeleting events...")
-            deleted_count = 0
-            
-            for event in matching_events:
-                try:
-                    service.events().delete(calendarId=CALENDAR_ID,
-                                          eventId=event["id"]).execute()
-                    event_title = event.get('summary', 'No title')
-                    print(f"✓ Deleted: {event_title}")
-                    deleted_count += 1
-                except Exception as e:
-                    event_title = event.get('summary', 'No title')
-                    print(f"✗ Failed to delete: {event_title} - Error: {e}")
-            
-            print(f"\nSuccessfully deleted {deleted_count} out of {len(matching_events)} events.")
+            executor = DeleteExecutor(service, CALENDAR_ID, creds, rate=args.rate, workers=args.workers)
+            deleted, failed = executor.run(matching_events)
+            print_delete_report(deleted, failed, executor)
+            index.remove(event['id'] for event in deleted)
         else:
             print("Deletion cancelled.")
 
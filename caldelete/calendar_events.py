@@ -0,0 +1,205 @@
+from __future__ import print_function
+
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+
+# Calendar's default quota is 600 queries per minute per user, and every
+# call counts against it, batched or not.
+DELETE_RATE = 10
+WORKERS = 4
+
+# Events still to delete, so an interrupted run can pick up where it stopped
+CHECKPOINT_FILE = "delete-checkpoint.jsonl"
+
+# 403s that mean "slow down"; other 403s (no access to the calendar) won't
+# go away on retry
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}
+
+
+class TokenBucket:
+    """Hands out rate tokens per second, up to burst at once; thread-safe"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        # at least one token, or a bucket slower than 1/s never fills up
+        self.capacity = max(1, burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.updated:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.updated - now
+            time.sleep(wait)
+
+    def hold(self, seconds):
+        """Hand out nothing for the next seconds, e.g. after being rate limited"""
+        with self.lock:
+            self.tokens = 0
+            self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+def retryable(error):
+    """Whether a failed delete is worth trying again"""
+    if not isinstance(error, HttpError):
+        return True  # connection errors
+    status = error.resp.status
+    if status == 403:
+        details = error.error_details if isinstance(error.error_details, list) else []
+        return any(isinstance(d, dict) and d.get("reason") in RATE_LIMIT_REASONS for d in details)
+    return status == 429 or status >= 500
+
+
+class DeleteExecutor:
+    """Deletes events from a pool of workers, kept under the Calendar quota.
+
+    Every call waits for a token from a shared bucket. Rate-limit and server
+    errors are retried with exponential backoff, and the backoff holds the
+    bucket so all workers slow down together. 410 Gone means the event was
+    already deleted and counts as success.
+
+    Progress goes to a checkpoint file as it happens; see load_checkpoint.
+    """
+
+    def __init__(self, service, calendar_id, creds=None, rate=DELETE_RATE, workers=WORKERS,
+                 retries=5, backoff=1.0, max_backoff=32.0, checkpoint=CHECKPOINT_FILE):
+        self.service = service
+        self.calendar_id = calendar_id
+        self.creds = creds
+        self.bucket = TokenBucket(rate)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.checkpoint = checkpoint
+        self.retry_counts = Counter()
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _http(self):
+        # httplib2 connections can't be shared between threads
+        if not hasattr(self.local, "http"):
+            http = httplib2.Http()
+            self.local.http = AuthorizedHttp(self.creds, http=http) if self.creds else http
+        return self.local.http
+
+    def _delete(self, event):
+        """Delete one event; returns None on success or the last error"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                self.service.events().delete(
+                    calendarId=self.calendar_id, eventId=event["id"]).execute(http=self._http())
+                return None
+            except HttpError as e:
+                if e.resp.status == 410:
+                    return None  # already gone
+                error = e
+            except (OSError, httplib2.HttpLib2Error) as e:
+                error = e
+
+            if attempt >= self.retries or not retryable(error):
+                return error
+            delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+            self.bucket.hold(delay * random.uniform(0.5, 1.0))
+            with self.lock:
+                self.retry_counts[str(error.resp.status) if isinstance(error, HttpError) else "network"] += 1
+            attempt += 1
+
+    def run(self, events):
+        """Delete events; returns (deleted, failed) for print_delete_report.
+
+        The checkpoint is removed once everything is deleted, and otherwise
+        keeps the events that are left.
+        """
+        write_checkpoint(self.checkpoint, self.calendar_id, events)
+        deleted = []
+        failed = []
+        start = time.monotonic()
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            with open(self.checkpoint, "a", encoding="utf-8") as log:
+                futures = {pool.submit(self._delete, event): event for event in events}
+                for future in as_completed(futures):
+                    event = futures[future]
+                    error = future.result()
+                    if error is None:
+                        deleted.append(event)
+                        log.write(json.dumps({"deleted": event["id"]}) + "\n")
+                        log.flush()
+                    else:
+                        failed.append((event, error))
+        except KeyboardInterrupt:
+            print(f"\nInterrupted; run again with --resume to delete the rest from {self.checkpoint}.")
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.elapsed = time.monotonic() - start
+
+        if not failed:
+            os.remove(self.checkpoint)
+        return deleted, failed
+
+
+def write_checkpoint(path, calendar_id, events):
+    """Start a checkpoint listing the events a run is about to delete"""
+    header = {"calendar_id": calendar_id,
+              "events": [{"id": e["id"], "summary": e.get("summary", "No title")} for e in events]}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """Return (calendar_id, events not yet deleted) from a checkpoint, or None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        done = set()
+        for line in f:
+            if line.endswith("\n"):  # the last line may be cut short
+                done.add(json.loads(line)["deleted"])
+    return header["calendar_id"], [e for e in header["events"] if e["id"] not in done]
+
+
+def print_delete_report(deleted, failed, executor=None):
+    """Print which events were deleted and which were not"""
+    for event in deleted:
+        print(f"✓ Deleted: {event.get('summary', 'No title')} ({event['id']})")
+    for event, error in failed:
+        print(f"✗ Failed to delete: {event.get('summary', 'No title')} ({event['id']}) - Error: {error}")
+    print(f"\nSuccessfully deleted {len(deleted)} out of {len(deleted) + len(failed)} events.")
+    if executor is not None:
+        rate = len(deleted) / executor.elapsed if executor.elapsed else 0
+        retries = sum(executor.retry_counts.values())
+        print(f"Took {executor.elapsed:.1f}s ({rate:.1f} deletes/s) with {retries} retries", end="")
+        if retries:
+            print(" (" + ", ".join(f"{status}: {n}" for status, n in sorted(executor.retry_counts.items())) + ")", end="")
+        print(".")
+        if failed:
+            print(f"{len(failed)} events are left in {executor.checkpoint}; run again with --resume to retry them.")
@@ -0,0 +1,162 @@
+from __future__ import print_function
+
+import sqlite3
+
+from googleapiclient.errors import HttpError
+
+# Default location of the local copy of the calendar
+INDEX_FILE = "events.db"
+
+# Only the attributes the scripts filter on or print; status marks
+# deleted events in incremental results
+SYNC_FIELDS = "nextPageToken,nextSyncToken,items(id,status,summary,start,colorId)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    expanded INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    summary TEXT,
+    start TEXT,
+    all_day INTEGER NOT NULL,
+    colour TEXT,
+    PRIMARY KEY (calendar_id, expanded, id)
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (calendar_id, expanded, start);
+CREATE INDEX IF NOT EXISTS events_colour ON events (calendar_id, expanded, colour, start);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT NOT NULL,
+    expanded INTEGER NOT NULL,
+    token TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, expanded)
+);
+"""
+
+
+class EventIndex:
+    """SQLite copy of a calendar's events, kept current with sync tokens.
+
+    The first sync downloads every event; later ones ask the API only for
+    what changed since the last sync. Recurring events are mirrored either
+    as series or, with expanded=True, as single instances (singleEvents);
+    the two are stored and synced separately.
+
+    start holds start.dateTime, or start.date for all-day events, so
+    comparing it with date or datetime strings orders events by the date
+    in their own time zone.
+    """
+
+    def __init__(self, path, calendar_id, expanded=False):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.calendar_id = calendar_id
+        self.expanded = expanded
+        self.key = (calendar_id, int(expanded))
+
+    def __len__(self):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM events WHERE calendar_id = ? AND expanded = ?", self.key).fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def sync(self, service, full=False):
+        """Pull changes from the API; returns (updated, removed) counts.
+
+        Falls back to a full sync when there is no sync token yet, when
+        full is set, or when the API no longer accepts the token (410).
+        """
+        token = None if full else self._token()
+        if token is not None:
+            try:
+                return self._pull(service, syncToken=token)
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                print("Sync token expired, downloading the calendar again...")
+        return self._pull(service)
+
+    def _token(self):
+        row = self.db.execute(
+            "SELECT token FROM sync_state WHERE calendar_id = ? AND expanded = ?", self.key).fetchone()
+        return row[0] if row else None
+
+    def _pull(self, service, **list_args):
+        updated = removed = 0
+        if self.expanded:
+            list_args["singleEvents"] = True
+        request = service.events().list(calendarId=self.calendar_id, fields=SYNC_FIELDS,
+                                        maxResults=2500, **list_args)
+
+        # One transaction, so an interrupted sync leaves the previous copy
+        # and its token in place
+        with self.db:
+            if "syncToken" not in list_args:
+                self.db.execute("DELETE FROM events WHERE calendar_id = ? AND expanded = ?", self.key)
+            while request is not None:
+                response = request.execute()
+                for event in response.get("items", []):
+                    if event.get("status") == "cancelled":
+                        removed += self._delete_rows([event["id"]])
+                    else:
+                        self._upsert(event)
+                        updated += 1
+                token = response.get("nextSyncToken")
+                request = service.events().list_next(request, response)
+            if token is not None:
+                self.db.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)", self.key + (token,))
+        return updated, removed
+
+    def _upsert(self, event):
+        start = event.get("start", {})
+        self.db.execute(
+            "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+            self.key + (event["id"], event.get("summary"), start.get("dateTime") or start.get("date"),
+                        int("dateTime" not in start), event.get("colorId")))
+
+    def _delete_rows(self, ids):
+        removed = 0
+        for event_id in ids:
+            removed += self.db.execute(
+                "DELETE FROM events WHERE calendar_id = ? AND expanded = ? AND id = ?",
+                self.key + (event_id,)).rowcount
+        return removed
+
+    def remove(self, ids):
+        """Drop events deleted by this run, without waiting for the next sync"""
+        with self.db:
+            return self._delete_rows(ids)
+
+    def events(self, start_min=None, start_max=None, colours=None):
+        """Return stored events starting in [start_min, start_max), by start.
+
+        colours takes the same values as caldelete-colour's --colour:
+        colour ids, "default" for events without one, or "any".
+        Events come back shaped like the API's, with the synced fields.
+        """
+        query = "SELECT id, summary, start, all_day, colour FROM events WHERE calendar_id = ? AND expanded = ?"
+        params = list(self.key)
+        if start_min is not None:
+            query += " AND start >= ?"
+            params.append(start_min)
+        if start_max is not None:
+            query += " AND start < ?"
+            params.append(start_max)
+        if colours is not None and "any" not in colours:
+            ids = [c for c in colours if c != "default"]
+            terms = ["colour IN (%s)" % ", ".join("?" * len(ids))] if ids else []
+            if "default" in colours:
+                terms.append("colour IS NULL")
+            query += " AND (%s)" % " OR ".join(terms)
+            params.extend(ids)
+        query += " ORDER BY start, id"
+
+        events = []
+        for event_id, summary, start, all_day, colour in self.db.execute(query, params):
+            event = {"id": event_id, "start": {"date" if all_day else "dateTime": start} if start else {}}
+            if summary is not None:
+                event["summary"] = summary
+            if colour is not None:
+                event["colorId"] = colour
+            events.append(event)
+        return events
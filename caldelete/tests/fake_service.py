@@ -0,0 +1,142 @@
+"""In-process stand-in for the parts of the Calendar API the scripts call"""
+
+import json
+import threading
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+
+def http_error(status, reason=None):
+    """An HttpError shaped like the API's, with an errors[].reason when given"""
+    error = {"code": status, "message": "fake"}
+    if reason:
+        error["errors"] = [{"domain": "usageLimits" if reason != "forbidden" else "global",
+                            "reason": reason, "message": "fake"}]
+    return HttpError(httplib2.Response({"status": status}), json.dumps({"error": error}).encode())
+
+
+class FakeRequest:
+    def __init__(self, calendar, params, offset=0):
+        self.calendar = calendar
+        self.params = params
+        self.offset = offset
+
+    def execute(self, http=None):
+        return self.calendar.execute_list(self)
+
+
+class FakeDelete:
+    def __init__(self, calendar, event_id):
+        self.calendar = calendar
+        self.event_id = event_id
+
+    def execute(self, http=None):
+        return self.calendar.execute_delete(self.event_id)
+
+
+class FakeEvents:
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def delete(self, calendarId, eventId):
+        return FakeDelete(self.calendar, eventId)
+
+    def list(self, **params):
+        self.calendar.list_calls.append(params)
+        return FakeRequest(self.calendar, params)
+
+    def list_next(self, request, response):
+        if "nextPageToken" not in response:
+            return None
+        return FakeRequest(self.calendar, request.params, int(response["nextPageToken"]))
+
+
+class FakeCalendar:
+    """Events with a change log, paged like events().list.
+
+    Sync tokens are positions in the change log. A full listing returns
+    live events; a listing with syncToken returns every event changed since,
+    cancelled ones included. expire_tokens() makes old tokens fail with 410.
+    fail_on_page makes the given page of the next listing fail with that status.
+
+    Deleting a missing event answers 404 and an already deleted one 410.
+    delete_faults maps an event id to the failures its next delete
+    attempts get, in order: a status, or (403, reason) for a 403 with
+    that reason, e.g. "rateLimitExceeded" or "forbidden". OSError stands
+    for a dropped connection.
+    """
+
+    def __init__(self, events=(), page_size=2):
+        self.events = {}
+        self.log = []
+        self.page_size = page_size
+        self.oldest_token = 0
+        self.list_calls = []
+        self.fail_on_page = None
+        self.delete_faults = {}
+        self.delete_calls = []
+        self.lock = threading.Lock()
+        for event in events:
+            self.upsert(event)
+
+    def service(self):
+        calendar = self
+
+        class Service:
+            def events(self):
+                return FakeEvents(calendar)
+
+        return Service()
+
+    def upsert(self, event):
+        self.events[event["id"]] = dict(event, status="confirmed")
+        self.log.append(event["id"])
+
+    def cancel(self, event_id):
+        self.events[event_id] = {"id": event_id, "status": "cancelled"}
+        self.log.append(event_id)
+
+    def expire_tokens(self):
+        self.oldest_token = len(self.log)
+
+    def execute_list(self, request):
+        params = request.params
+        if "syncToken" in params:
+            token = int(params["syncToken"])
+            if token < self.oldest_token:
+                raise http_error(410)
+            ids = list(dict.fromkeys(reversed(self.log[token:])))[::-1]
+            items = [self.events[event_id] for event_id in ids]
+        else:
+            items = [e for e in self.events.values() if e["status"] != "cancelled"]
+
+        page = request.offset // self.page_size
+        if self.fail_on_page is not None and self.fail_on_page[0] == page:
+            status = self.fail_on_page[1]
+            self.fail_on_page = None
+            raise http_error(status)
+
+        response = {"items": items[request.offset:request.offset + self.page_size]}
+        if request.offset + self.page_size < len(items):
+            response["nextPageToken"] = str(request.offset + self.page_size)
+        else:
+            response["nextSyncToken"] = str(len(self.log))
+        return response
+
+    def execute_delete(self, event_id):
+        with self.lock:
+            self.delete_calls.append(event_id)
+            faults = self.delete_faults.get(event_id)
+            fault = faults.pop(0) if faults else None
+            if fault is OSError:
+                raise ConnectionResetError("fake connection reset")
+            if fault is not None:
+                raise http_error(*fault) if isinstance(fault, tuple) else http_error(fault)
+            event = self.events.get(event_id)
+            if event is None:
+                raise http_error(404)
+            if event["status"] == "cancelled":
+                raise http_error(410)
+            self.cancel(event_id)
+        return ""
@@ -0,0 +1,134 @@
+import json
+import os
+from collections import Counter
+
+import pytest
+
+from calendar_events import DeleteExecutor, load_checkpoint, print_delete_report
+from fake_service import FakeCalendar
+
+RATE_LIMITED = (403, "rateLimitExceeded")
+FORBIDDEN = (403, "forbidden")
+
+
+@pytest.fixture
+def calendar():
+    return FakeCalendar([{"id": f"ev{i}", "summary": f"CS 135 LEC {i}"} for i in range(20)])
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return str(tmp_path / "delete-checkpoint.jsonl")
+
+
+def executor(calendar, checkpoint, **kwargs):
+    options = dict(rate=1000, workers=4, retries=3, backoff=0.001, max_backoff=0.01, checkpoint=checkpoint)
+    options.update(kwargs)
+    return DeleteExecutor(calendar.service(), "primary", **options)
+
+
+def events(calendar, ids=None):
+    return [{"id": e["id"], "summary": e["summary"]} for e in calendar.events.values()
+            if ids is None or e["id"] in ids]
+
+
+def ids(events):
+    return sorted(e["id"] for e in events)
+
+
+def test_deletes_everything(calendar, checkpoint, capsys):
+    run = executor(calendar, checkpoint)
+    deleted, failed = run.run(events(calendar))
+    assert len(deleted) == 20 and failed == []
+    assert all(e["status"] == "cancelled" for e in calendar.events.values())
+    assert len(calendar.delete_calls) == 20
+    assert not os.path.exists(checkpoint)
+
+    print_delete_report(deleted, failed, run)
+    out = capsys.readouterr().out
+    assert "Successfully deleted 20 out of 20 events." in out
+    assert "with 0 retries." in out
+
+
+def test_already_deleted_counts_as_deleted(calendar, checkpoint):
+    targets = events(calendar, {"ev1", "ev2"})
+    calendar.cancel("ev1")
+    calendar.delete_faults = {"ev2": [410]}
+    deleted, failed = executor(calendar, checkpoint).run(targets)
+    assert ids(deleted) == ["ev1", "ev2"] and failed == []
+    assert Counter(calendar.delete_calls) == {"ev1": 1, "ev2": 1}
+
+
+@pytest.mark.parametrize("fault", [FORBIDDEN, 403, 404, 400])
+def test_permanent_errors_are_not_retried(calendar, checkpoint, fault):
+    calendar.delete_faults = {"ev3": [fault] * 5}
+    run = executor(calendar, checkpoint)
+    deleted, failed = run.run(events(calendar, {"ev3", "ev4"}))
+    assert ids(deleted) == ["ev4"]
+    assert [(event["id"], error.resp.status) for event, error in failed] == [("ev3", 403 if fault == FORBIDDEN else fault)]
+    assert calendar.delete_calls.count("ev3") == 1
+    assert sum(run.retry_counts.values()) == 0
+
+
+def test_missing_event_fails(calendar, checkpoint):
+    deleted, failed = executor(calendar, checkpoint).run([{"id": "nope", "summary": "Gone"}])
+    assert deleted == [] and failed[0][1].resp.status == 404
+
+
+def test_rate_limits_and_server_errors_are_retried_and_counted(calendar, checkpoint):
+    calendar.delete_faults = {
+        "ev0": [RATE_LIMITED, RATE_LIMITED],
+        "ev1": [(403, "userRateLimitExceeded")],
+        "ev2": [429],
+        "ev3": [500, 503],
+        "ev4": [OSError]
+    }
+    run = executor(calendar, checkpoint)
+    deleted, failed = run.run(events(calendar))
+    assert len(deleted) == 20 and failed == []
+    assert run.retry_counts == {"403": 3, "429": 1, "500": 1, "503": 1, "network": 1}
+    assert calendar.delete_calls.count("ev0") == 3
+    assert not os.path.exists(checkpoint)
+
+
+def test_retries_run_out_and_checkpoint_is_kept(calendar, checkpoint, capsys):
+    calendar.delete_faults = {"ev5": [503] * 10, "ev6": [RATE_LIMITED] * 10}
+    run = executor(calendar, checkpoint, retries=2)
+    deleted, failed = run.run(events(calendar))
+    assert len(deleted) == 18
+    assert ids(event for event, _ in failed) == ["ev5", "ev6"]
+    assert calendar.delete_calls.count("ev5") == 3
+    assert run.retry_counts == {"503": 2, "403": 2}
+
+    assert os.path.exists(checkpoint)
+    calendar_id, left = load_checkpoint(checkpoint)
+    assert calendar_id == "primary"
+    assert ids(left) == ["ev5", "ev6"]
+    assert left[0]["summary"].startswith("CS 135 LEC")
+
+    print_delete_report(deleted, failed, run)
+    assert "2 events are left in" in capsys.readouterr().out
+
+
+def test_resume_deletes_only_what_is_left(calendar, checkpoint):
+    calendar.delete_faults = {"ev7": [500] * 4, "ev8": [FORBIDDEN]}
+    executor(calendar, checkpoint, retries=1).run(events(calendar))
+    assert len(calendar.delete_calls) == 20 + 1
+
+    calendar.delete_calls.clear()
+    calendar_id, left = load_checkpoint(checkpoint)
+    assert ids(left) == ["ev7", "ev8"]
+    calendar.delete_faults = {}
+    deleted, failed = executor(calendar, checkpoint).run(left)
+    assert ids(deleted) == ["ev7", "ev8"] and failed == []
+    assert sorted(calendar.delete_calls) == ["ev7", "ev8"]
+    assert not os.path.exists(checkpoint)
+    assert all(e["status"] == "cancelled" for e in calendar.events.values())
+
+
+def test_checkpoint_ignores_cut_off_last_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    header = {"calendar_id": "primary", "events": [{"id": "a", "summary": "A"}, {"id": "b", "summary": "B"}]}
+    path.write_text(json.dumps(header) + "\n" + json.dumps({"deleted": "a"}) + "\n" + '{"deleted": "b', encoding="utf-8")
+    assert load_checkpoint(str(path)) == ("primary", [{"id": "b", "summary": "B"}])
+    assert load_checkpoint(str(tmp_path / "missing.jsonl")) is None
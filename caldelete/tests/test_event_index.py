@@ -0,0 +1,128 @@
+import pytest
+from googleapiclient.errors import HttpError
+
+from event_index import SYNC_FIELDS, EventIndex
+from fake_service import FakeCalendar
+
+
+def timed(event_id, summary, start, colour=None):
+    event = {"id": event_id, "summary": summary, "start": {"dateTime": start}}
+    if colour:
+        event["colorId"] = colour
+    return event
+
+
+def all_day(event_id, summary, date):
+    return {"id": event_id, "summary": summary, "start": {"date": date}}
+
+
+EVENTS = [
+    timed("a", "CS 135 LEC", "2024-09-05T10:30:00-04:00", "3"),
+    timed("b", "MATH 135 TUT", "2024-09-06T14:30:00-04:00"),
+    all_day("c", "Reading week", "2024-10-14"),
+    timed("d", "ECON 101 LEC", "2024-09-04T08:30:00-04:00", "7"),
+    {"id": "e", "start": {"dateTime": "2024-12-01T09:00:00-05:00"}}
+]
+
+
+@pytest.fixture
+def calendar():
+    return FakeCalendar(EVENTS, page_size=2)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = EventIndex(str(tmp_path / "events.db"), "primary")
+    yield index
+    index.close()
+
+
+def ids(index, **query):
+    return [event["id"] for event in index.events(**query)]
+
+
+def test_full_sync(calendar, index):
+    assert index.sync(calendar.service()) == (5, 0)
+    assert len(index) == 5
+    assert ids(index) == ["d", "a", "b", "c", "e"]
+    assert index.events()[1] == {"id": "a", "summary": "CS 135 LEC",
+                                 "start": {"dateTime": "2024-09-05T10:30:00-04:00"}, "colorId": "3"}
+    assert index.events(start_min="2024-10-14", start_max="2024-10-15") == [
+        {"id": "c", "summary": "Reading week", "start": {"date": "2024-10-14"}}]
+    assert index.events(start_min="2024-12")[0] == {"id": "e", "start": {"dateTime": "2024-12-01T09:00:00-05:00"}}
+    assert ids(index, colours=["3", "default"]) == ["a", "b", "c", "e"]
+
+    # three pages, no sync token yet, and only the synced fields asked for
+    assert len(calendar.list_calls) == 1
+    assert calendar.list_calls[0] == {"calendarId": "primary", "fields": SYNC_FIELDS, "maxResults": 2500}
+
+
+def test_incremental_updates_and_cancellations(calendar, index):
+    index.sync(calendar.service())
+    calendar.upsert(timed("a", "CS 135 LEC (moved)", "2024-09-05T13:00:00-04:00"))
+    calendar.upsert(all_day("f", "Exam", "2024-12-10"))
+    calendar.cancel("b")
+    calendar.cancel("never-synced")
+
+    assert index.sync(calendar.service()) == (2, 1)
+    assert calendar.list_calls[-1]["syncToken"] == "5"
+    assert ids(index) == ["d", "a", "c", "e", "f"]
+    moved = index.events(start_min="2024-09-05", start_max="2024-09-06")[0]
+    assert moved == {"id": "a", "summary": "CS 135 LEC (moved)", "start": {"dateTime": "2024-09-05T13:00:00-04:00"}}
+
+    # nothing changed since
+    assert index.sync(calendar.service()) == (0, 0)
+    assert len(index) == 5
+
+
+def test_expired_token_resyncs(calendar, index, capsys):
+    index.sync(calendar.service())
+    calendar.cancel("a")
+    calendar.upsert(timed("f", "New", "2025-01-06T09:00:00-05:00"))
+    calendar.expire_tokens()
+
+    assert index.sync(calendar.service()) == (5, 0)
+    assert "Sync token expired" in capsys.readouterr().out
+    assert [("syncToken" in params) for params in calendar.list_calls] == [False, True, False]
+    assert ids(index) == ["d", "b", "c", "e", "f"]
+
+    # the new token works again
+    calendar.cancel("f")
+    assert index.sync(calendar.service()) == (0, 1)
+
+
+def test_full_flag_ignores_token(calendar, index):
+    index.sync(calendar.service())
+    index.sync(calendar.service(), full=True)
+    assert ["syncToken" in params for params in calendar.list_calls] == [False, False]
+    assert len(index) == 5
+
+
+def test_failed_sync_keeps_previous_copy(calendar, index):
+    index.sync(calendar.service())
+    calendar.cancel("a")
+    calendar.cancel("b")
+    calendar.cancel("c")
+    calendar.fail_on_page = (1, 500)
+
+    with pytest.raises(HttpError):
+        index.sync(calendar.service())
+    assert len(index) == 5
+
+    # the token from before the failure still picks up every change
+    assert index.sync(calendar.service()) == (0, 3)
+    assert ids(index) == ["d", "e"]
+
+
+def test_expanded_copy_is_separate(calendar, tmp_path):
+    path = str(tmp_path / "events.db")
+    series = EventIndex(path, "primary")
+    instances = EventIndex(path, "primary", expanded=True)
+    series.sync(calendar.service())
+    assert len(instances) == 0
+    instances.sync(calendar.service())
+    assert calendar.list_calls[-1]["singleEvents"] is True
+    assert instances.remove(["a", "b"]) == 2
+    assert (len(series), len(instances)) == (5, 3)
+    series.close()
+    instances.close()
@@ -0,0 +1,36 @@
+import threading
+import time
+
+from calendar_events import TokenBucket
+
+
+def acquire_within(bucket, seconds):
+    thread = threading.Thread(target=bucket.acquire, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    return not thread.is_alive()
+
+
+def test_slow_rate_still_hands_out_tokens():
+    bucket = TokenBucket(0.5)
+    assert bucket.capacity == 1
+    assert acquire_within(bucket, 1)
+
+
+def test_burst_then_rate():
+    bucket = TokenBucket(50, burst=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_hold_pauses_everyone():
+    bucket = TokenBucket(100)
+    bucket.hold(0.2)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,59 @@
+import re
+
+
+def load_patterns(path):
+    """Read one pattern per line, skipping blank lines and # comments"""
+    patterns = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                patterns.append(line)
+    return patterns
+
+
+class TitleMatcher:
+    """Case-insensitive substring matcher for many patterns at once.
+
+    The patterns are case-folded into a trie and the trie is written out
+    as one regex, so alternatives that share a prefix ("cs 135", "cs 136")
+    share it in the regex too. A title is then scanned once, however many
+    patterns there are, instead of once per pattern.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = {}
+        for pattern in patterns:
+            if pattern:
+                self.patterns.setdefault(pattern.casefold(), pattern)
+
+        trie = {}
+        for folded in self.patterns:
+            node = trie
+            for char in folded:
+                node = node.setdefault(char, {})
+            node[""] = True
+        self.regex = re.compile(_trie_regex(trie)) if trie else None
+
+    def match(self, title):
+        """Return the pattern found in the title, or None.
+
+        When several patterns match, the one starting first wins, and of
+        those the longest.
+        """
+        if not title or self.regex is None:
+            return None
+        found = self.regex.search(title.casefold())
+        return self.patterns[found.group()] if found else None
+
+
+def _trie_regex(node):
+    branches = [re.escape(char) + _trie_regex(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    ends_here = "" in node
+    if len(branches) == 1 and not ends_here:
+        return branches[0]
+    # greedy ? prefers the longer pattern when a shorter one ends here
+    return "(?:" + "|".join(branches) + ")" + ("?" if ends_here else "")
@@ -0,0 +1,68 @@
+import argparse
+import time
+from pathlib import Path
+
+import parse
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+
+def save_fixtures(years, pages, fixture_dir=FIXTURE_DIR):
+    """
+    Download the first few gallery pages of each year as fixtures.
+    """
+    from main import fetch_page
+
+    fixture_dir.mkdir(exist_ok=True)
+    for year in years:
+        for page in range(1, pages + 1):
+            html = fetch_page(year, page)
+            if not html or not parse.parse_projects(html, year):
+                break
+            (fixture_dir / f"{year}-{page}.html").write_text(html, encoding="utf-8")
+            print(f"Saved {year} page {page}")
+
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    fixtures = []
+    for path in sorted(Path(fixture_dir).glob("*.html")):
+        year = int(path.stem.split("-")[0])
+        fixtures.append((year, path.read_text(encoding="utf-8")))
+    return fixtures
+
+
+def bench(name, func, fixtures, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for year, html in fixtures:
+            func(html, year)
+    per_page = (time.perf_counter() - start) / (rounds * len(fixtures))
+    print(f"{name:<14} {per_page * 1000:8.2f} ms/page")
+    return per_page
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare gallery page parsers on saved HTML fixtures.")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURE_DIR, help="directory of <year>-<page>.html files")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--save", type=int, metavar="PAGES",
+                        help="first download this many pages per year (2014-2025) into the fixture directory")
+    args = parser.parse_args()
+
+    if args.save:
+        save_fixtures(range(2014, 2026), args.save, args.fixtures)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit(f"No fixtures in {args.fixtures}, run with --save first")
+
+    print(f"{len(fixtures)} pages, {sum(len(html) for _, html in fixtures) / 1e6:.1f} MB of HTML")
+    for year, html in fixtures:
+        if parse.parse_page_soup(html, year) != parse.parse_page(html, year):
+            print(f"Warning: parsers disagree on a {year} page")
+            break
+
+    slow = bench("html.parser", parse.parse_page_soup, fixtures, args.rounds)
+    if parse.lxml is not None:
+        fast = bench("lxml", parse.parse_page, fixtures, args.rounds)
+        print(f"lxml is {slow / fast:.1f}x faster")
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# responses worth keeping: pages, and galleries that do not exist
+CACHED_STATUSES = {200, 404}
+
+
+class FetchError(Exception):
+    """
+    A request that still failed after every retry.
+    """
+
+
+class ResponseCache:
+    """
+    On-disk store of GET responses keyed by URL: the body, and a JSON
+    sidecar with the status, encoding, ETag, Last-Modified and the time
+    the response was last confirmed fresh.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode()).hexdigest()[:32]
+        return self.directory / f"{key}.body", self.directory / f"{key}.json"
+
+    def load(self, url: str):
+        """
+        Return the cached entry for a URL (its metadata plus "body"), or None.
+        """
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r") as f:
+                entry = json.load(f)
+            entry["body"] = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def store(self, url: str, resp):
+        body_path, meta_path = self._paths(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_atomic(body_path, resp.content)
+        self._write_meta(meta_path, {
+            "url": url,
+            "status": resp.status_code,
+            "encoding": resp.encoding,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "checked_at": time.time()
+        })
+
+    def touch(self, url: str, entry: dict):
+        """
+        Mark an entry fresh again after the server answered 304.
+        """
+        meta = {key: value for key, value in entry.items() if key != "body"}
+        meta["checked_at"] = time.time()
+        self._write_meta(self._paths(url)[1], meta)
+
+    def _write_meta(self, meta_path, meta):
+        _write_atomic(meta_path, json.dumps(meta).encode())
+
+
+def _write_atomic(path, data: bytes):
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _cached_response(url: str, entry: dict):
+    resp = requests.Response()
+    resp.url = url
+    resp.status_code = entry["status"]
+    resp.encoding = entry["encoding"]
+    resp._content = entry["body"]
+    resp.from_cache = True
+    return resp
+
+
+class Fetcher:
+    """
+    HTTP client shared by all scraper threads. One requests.Session keeps
+    connections alive across workers, requests to each host are spaced to
+    at most `rate` per second, and 429/5xx responses and connection errors
+    are retried with jittered exponential backoff (honouring Retry-After).
+
+    With a cache directory, 200 and 404 responses are kept on disk and
+    reused; see get for how max_age and immutable_after decide when they
+    are revalidated.
+    """
+
+    def __init__(self, rate: float = 5.0, retries: int = 4, backoff: float = 0.5,
+                 max_backoff: float = 30.0, timeout: float = 10, pool_size: int = 20,
+                 cache_dir=None):
+        self.interval = 1 / rate if rate else 0
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self.requests = 0
+        self.retried = 0
+        self.failures = []
+
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.cache_hits = 0
+        self.not_modified = 0
+
+    def _wait_turn(self, host: str):
+        # Reserve the next free slot for this host, then sleep until it.
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+            self.requests += 1
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _delay(self, attempt: int, resp=None):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.max_backoff))
+        return delay
+
+    def get(self, url: str, max_age: float = 0, immutable_after: float = None, **kwargs):
+        """
+        GET a URL and return the response, which may still be a 4xx other
+        than 429. Raises FetchError once the retries are used up, after
+        recording the URL in self.failures.
+
+        A cached response younger than max_age seconds is returned without
+        touching the network (math.inf keeps it forever). So is a cached
+        200 last confirmed after immutable_after, a Unix time after which
+        the resource no longer changes; 404s are never kept that way. Any
+        other entry is revalidated with If-None-Match/If-Modified-Since,
+        and a 304 returns the cached body. Responses served from the cache
+        have from_cache set.
+        """
+        entry = self.cache.load(url) if self.cache else None
+        if entry is not None:
+            frozen = (immutable_after is not None and entry["status"] == 200
+                      and entry["checked_at"] > immutable_after)
+            if frozen or max_age == math.inf or time.time() - entry["checked_at"] < max_age:
+                with self._lock:
+                    self.cache_hits += 1
+                return _cached_response(url, entry)
+            headers = dict(kwargs.pop("headers", None) or {})
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+            kwargs["headers"] = headers
+
+        resp = self._request(url, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            self.cache.touch(url, entry)
+            with self._lock:
+                self.not_modified += 1
+            return _cached_response(url, entry)
+        if self.cache and resp.status_code in CACHED_STATUSES:
+            self.cache.store(url, resp)
+        return resp
+
+    def _request(self, url: str, **kwargs):
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            self._wait_turn(host)
+            resp = None
+            try:
+                resp = self.session.get(url, timeout=self.timeout, **kwargs)
+                if resp.status_code not in RETRY_STATUSES:
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                reason = type(e).__name__
+            if attempt < self.retries:
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self._delay(attempt, resp))
+
+        with self._lock:
+            self.failures.append((url, reason))
+        raise FetchError(f"{url}: {reason} after {self.retries + 1} attempts")
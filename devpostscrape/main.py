@@ -1,52 +1,239 @@
+import argparse
+import multiprocessing
 import requests
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fetch import Fetcher, FetchError
+from parse import parse_page, parse_projects
+from sink import ResultWriter, TopK, read_results
 
 BASE_URL = "https://hackthenorth{year}.devpost.com/project-gallery?page={page}"
+# pages per year the old blind fan-out requested, for comparison
+BLIND_PAGES = 50
+# safety limit on how far discovery probes
+MAX_PAGES = 500
+WORKERS = 20
+# runs fetching at least this many pages parse them in a process pool
+PROCESS_POOL_PAGES = 200
+
+CACHE_DIR = Path(__file__).parent / ".devpost_cache"
+# seconds a cached page is trusted before revalidating it, unless it was
+# fetched after its year ended (see year_end)
+CACHE_MAX_AGE = 0
+
+# used when no fetcher is passed in
+DEFAULT_FETCHER = Fetcher(pool_size=WORKERS, cache_dir=CACHE_DIR)
+
+
+def year_end(year: int):
+    """
+    Unix time at which a year's gallery stops changing. A page cached
+    after that is kept for good; one cached earlier may have been fetched
+    mid-hackathon and is revalidated like a current-year page.
+    """
+    return datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def start_parse_pool():
+    """
+    Process pool for parsing pages. It starts while the fetch threads are
+    mid-request, and forking a multi-threaded process can deadlock the
+    child, so its workers come from a fork server (or are spawned where
+    there is none) rather than forked from this process.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
 
-def scrape_page(year: int, page: int):
+
+def fetch_page(year: int, page: int, fetcher: Fetcher = None):
+    """
+    Return the HTML of one gallery page, "" if the year has no gallery
+    (404), or None if the request failed even after retries. Cached pages
+    are reused according to CACHE_MAX_AGE and year_end.
+    """
     url = BASE_URL.format(year=year, page=page)
     try:
-        resp = requests.get(url, timeout=10)
+        resp = (fetcher or DEFAULT_FETCHER).get(url, max_age=CACHE_MAX_AGE, immutable_after=year_end(year))
+        if resp.status_code == 404:
+            return ""
         resp.raise_for_status()
-    except requests.RequestException:
-        return []
+    except (FetchError, requests.RequestException):
+        return None
+    return resp.text
+
+
+def scrape_page(year: int, page: int, fetcher: Fetcher = None):
+    """
+    Return the projects on one gallery page ([] for an empty page), or
+    None if the page could not be fetched.
+    """
+    html = fetch_page(year, page, fetcher)
+    if html is None:
+        return None
+    return parse_projects(html, year)
+
+
+def find_last_page(year: int, fetcher: Fetcher = None, max_pages: int = MAX_PAGES):
+    """
+    Find the last non-empty gallery page of a year with as few requests as
+    possible. Page 1's pagination controls give the answer directly when
+    present; otherwise pages 2, 4, 8, ... are probed until one is empty and
+    the boundary is binary searched.
+
+    Returns (last_page, probed) where probed maps every fetched page to its
+    projects, or None for pages that failed. Failed probes count as
+    non-empty so they are fetched again rather than silently dropped. If
+    page 1 itself fails there is nothing to go on, so the blind range of
+    BLIND_PAGES pages is returned and fetched instead.
+    """
+    probed = {}
+
+    html = fetch_page(year, 1, fetcher)
+    if html is None:
+        probed[1] = None
+        return min(BLIND_PAGES, max_pages), probed
+    probed[1], last = parse_page(html, year)
+    if not probed[1]:
+        return 0, probed
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    entries = soup.select(".software-entry")
-    projects = []
+    if last:
+        return min(last, max_pages), probed
 
-    for entry in entries:
-        name_tag = entry.select_one("h5")
-        like_tag = entry.select_one(".count.like-count")
-        if not name_tag:
-            continue
+    def non_empty(page):
+        if page not in probed:
+            probed[page] = scrape_page(year, page, fetcher)
+        return probed[page] is None or bool(probed[page])
 
-        name = name_tag.get_text(strip=True)
-        likes = int(like_tag.get_text(strip=True)) if like_tag else 0
+    # lo is known non-empty, hi is known empty (or past max_pages)
+    lo, hi = 1, 2
+    while hi <= max_pages and non_empty(hi):
+        lo, hi = hi, hi * 2
+    hi = min(hi, max_pages + 1)
 
-        projects.append({
-            "year": year,
-            "name": name,
-            "likes": likes
-        })
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if non_empty(mid):
+            lo = mid
+        else:
+            hi = mid
 
-    return projects
+    return lo, probed
 
 
-def scrape_all(years=range(2014, 2026)):
+def scrape_all(years=range(2014, 2026), discover=True, stats=None, fetcher: Fetcher = None,
+               parse_processes: bool = None, out=None, resume: bool = False, top_k: int = None):
+    """
+    Scrape every project of every year, sorted by likes. Each project
+    records the gallery page it came from.
+
+    With discover=True each year's last page is found first (see
+    find_last_page) and only existing pages are fetched; otherwise 50
+    pages per year are requested blindly. Pass a dict as stats to get the
+    number of pages requested, the number the blind fan-out would have
+    requested, how many were served from the cache without a request or
+    revalidated with a 304, the number of retries and the (year, page)
+    pairs that still failed after retrying.
+
+    All workers share one Fetcher, which pools connections, rate-limits
+    and retries; pass one in to change those settings.
+
+    Pages are parsed on the fetching threads, or, when parse_processes is
+    true (by default, when PROCESS_POOL_PAGES or more pages are left after
+    discovery), handed to a process pool so parsing neither holds the GIL
+    nor delays the network threads.
+
+    With out, each page's projects are appended to that JSONL (or .csv)
+    file as soon as the page is done. resume=True keeps the file and skips
+    the (year, page) pairs already in it; their projects still count
+    towards the result. With top_k only the k most liked projects are kept
+    and returned, in a bounded heap rather than one big sorted list.
+    """
+    fetcher = fetcher or DEFAULT_FETCHER
+    counts_before = (fetcher.retried, fetcher.cache_hits, fetcher.not_modified)
+    years = list(years)
     results = []
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        futures = []
-        for year in years:
+    board = TopK(top_k) if top_k else None
+    failed = []
+    requests_made = 0
+
+    def keep(projects):
+        if board:
+            for project in projects:
+                board.add(project)
+        else:
+            results.extend(projects)
+
+    def collect(year, page, projects):
+        for project in projects:
+            project["page"] = page
+        keep(projects)
+        if writer and projects:
+            writer.write(projects)
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor, \
+            (ResultWriter(out, append=resume) if out else nullcontext()) as writer:
+        done = set()
+        if resume and out:
+            previous = read_results(out)
+            done = {(project["year"], project["page"]) for project in previous}
+            keep(previous)
+
+        pages = {}
+        if discover:
+            discoveries = {executor.submit(find_last_page, year, fetcher): year for year in years}
+            for future in as_completed(discoveries):
+                year = discoveries[future]
+                last, probed = future.result()
+                requests_made += len(probed)
+                for page, projects in probed.items():
+                    if projects is not None and (year, page) not in done:
+                        collect(year, page, projects)
+                pages[year] = [page for page in range(1, last + 1)
+                               if page not in probed or probed[page] is None]
+        else:
             # guess up to 50 pages; stop when empty
-            for page in range(1, 51):
-                futures.append(executor.submit(scrape_page, year, page))
+            pages = {year: range(1, BLIND_PAGES + 1) for year in years}
+
+        todo = [(year, page) for year in years for page in pages[year] if (year, page) not in done]
+        if parse_processes is None:
+            parse_processes = len(todo) >= PROCESS_POOL_PAGES
+
+        with start_parse_pool() if parse_processes else nullcontext() as parse_pool:
+            task = fetch_page if parse_pool else scrape_page
+            fetching = {executor.submit(task, year, page, fetcher): (year, page) for year, page in todo}
+            parsing = {}
+
+            # one loop over fetches and parses, so each page is written as
+            # soon as it is parsed rather than after the last fetch
+            while fetching or parsing:
+                finished, _ = wait([*fetching, *parsing], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in parsing:
+                        collect(*parsing.pop(future), future.result())
+                        continue
+                    requests_made += 1
+                    year, page = fetching.pop(future)
+                    result = future.result()
+                    if result is None:
+                        failed.append((year, page))
+                    elif parse_pool:
+                        parsing[parse_pool.submit(parse_projects, result, year)] = (year, page)
+                    else:
+                        collect(year, page, result)
 
-        for future in as_completed(futures):
-            projects = future.result()
-            if projects:  # only add if page not empty
-                results.extend(projects)
+    if stats is not None:
+        stats["requests"] = requests_made
+        stats["blind_requests"] = len(years) * BLIND_PAGES
+        stats["retries"] = fetcher.retried - counts_before[0]
+        stats["cached"] = fetcher.cache_hits - counts_before[1]
+        stats["not_modified"] = fetcher.not_modified - counts_before[2]
+        stats["failed"] = sorted(failed)
+
+    if board:
+        return board.ranked()
 
     # sort by likes, descending
     results.sort(key=lambda x: x["likes"], reverse=True)
@@ -54,6 +241,29 @@ def scrape_all(years=range(2014, 2026)):
 
 
 if __name__ == "__main__":
-    all_projects = scrape_all()
-    for proj in all_projects[:50]:  # top 50
+    parser = argparse.ArgumentParser(description="Rank Hack the North Devpost projects by likes.")
+    parser.add_argument("--rate", type=float, default=5.0, help="maximum requests per second per host")
+    parser.add_argument("--retries", type=int, default=4, help="retries for 429/5xx responses and connection errors")
+    parser.add_argument("--base-url", default=BASE_URL, help="gallery URL template with {year} and {page}")
+    parser.add_argument("--no-cache", action="store_true", help=f"do not read or write the page cache in {CACHE_DIR.name}")
+    parser.add_argument("--out", help="stream every project to this JSONL file (or CSV, by extension)")
+    parser.add_argument("--resume", action="store_true", help="skip pages already written to --out")
+    parser.add_argument("--top", type=int, default=50, help="how many projects to print")
+    args = parser.parse_args()
+    if args.resume and not args.out:
+        parser.error("--resume needs --out")
+    BASE_URL = args.base_url
+
+    stats = {}
+    fetcher = Fetcher(rate=args.rate, retries=args.retries, pool_size=WORKERS,
+                      cache_dir=None if args.no_cache else CACHE_DIR)
+    top_projects = scrape_all(stats=stats, fetcher=fetcher, out=args.out, resume=args.resume, top_k=args.top)
+    for proj in top_projects:
         print(proj)
+
+    saved = stats["blind_requests"] - stats["requests"]
+    print(f"\n{stats['requests']} pages requested ({saved} fewer than fetching {BLIND_PAGES} pages per year), "
+          f"{stats['retries']} retries")
+    print(f"{stats['cached']} pages from cache, {stats['not_modified']} revalidated unchanged")
+    if stats["failed"]:
+        print(f"Failed pages: {stats['failed']}")
@@ -0,0 +1,84 @@
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # fall back to BeautifulSoup's html.parser
+    lxml = None
+
+
+def parse_page(html: str, year: int):
+    """
+    Parse one gallery page into (projects, last_page). Each project has
+    year, name, likes, url, tagline and winner; last_page is the highest
+    page number in the pagination controls, or None if there are none.
+
+    Uses lxml when it is installed: one C-level parse, then only the
+    .software-entry nodes and the pagination links are visited. Otherwise
+    falls back to BeautifulSoup, which gives the same result more slowly.
+    """
+    if not html.strip():
+        return [], None
+    if lxml is None:
+        return parse_page_soup(html, year)
+
+    tree = lxml.html.fromstring(html)
+    projects = []
+
+    for entry in tree.find_class("software-entry"):
+        name_tag = next(entry.iter("h5"), None)
+        if name_tag is None:
+            continue
+        like_tag = next((el for el in entry.find_class("like-count")
+                         if "count" in el.classes), None)
+        tagline_tag = next(iter(entry.find_class("tagline")), None)
+        link = next(entry.iterancestors("a"), None)
+
+        projects.append({
+            "year": year,
+            "name": _text(name_tag),
+            "likes": int(_text(like_tag)) if like_tag is not None else 0,
+            "url": link.get("href") if link is not None else None,
+            "tagline": _text(tagline_tag) if tagline_tag is not None else "",
+            "winner": bool(entry.find_class("winner"))
+        })
+
+    numbers = [int(_text(a)) for nav in tree.find_class("pagination")
+               for a in nav.iter("a") if _text(a).isdigit()]
+    return projects, max(numbers) if numbers else None
+
+
+def _text(element):
+    return " ".join(element.text_content().split())
+
+
+def parse_page_soup(html: str, year: int):
+    """
+    parse_page using BeautifulSoup's html.parser.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    projects = []
+
+    for entry in soup.select(".software-entry"):
+        name_tag = entry.select_one("h5")
+        like_tag = entry.select_one(".count.like-count")
+        tagline_tag = entry.select_one(".tagline")
+        link = entry.find_parent("a")
+        if not name_tag:
+            continue
+
+        projects.append({
+            "year": year,
+            "name": " ".join(name_tag.get_text().split()),
+            "likes": int(like_tag.get_text(strip=True)) if like_tag else 0,
+            "url": link.get("href") if link else None,
+            "tagline": " ".join(tagline_tag.get_text().split()) if tagline_tag else "",
+            "winner": entry.select_one(".winner") is not None
+        })
+
+    numbers = [int(a.get_text(strip=True)) for a in soup.select(".pagination a")
+               if a.get_text(strip=True).isdigit()]
+    return projects, max(numbers) if numbers else None
+
+
+def parse_projects(html: str, year: int):
+    return parse_page(html, year)[0]
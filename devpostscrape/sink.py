@@ -0,0 +1,127 @@
+import csv
+import heapq
+import io
+import json
+from pathlib import Path
+
+FIELDS = ["year", "page", "name", "likes", "url", "tagline", "winner"]
+
+
+class ResultWriter:
+    """
+    Append projects to a JSONL file, or a CSV file if the path ends in
+    .csv, flushing after every page so a crash loses at most the page
+    being written. Opening with append=True first removes the last page
+    in the file, which may be incomplete, so it gets fetched again.
+    """
+
+    def __init__(self, path, append: bool = False):
+        self.path = Path(path)
+        self.csv = self.path.suffix.lower() == ".csv"
+        if append:
+            _drop_last_page(self.path, self.csv)
+        new_file = not append or not self.path.exists() or self.path.stat().st_size == 0
+        self.file = open(self.path, "a" if append else "w", encoding="utf-8", newline="")
+        if self.csv and new_file:
+            self.file.write(_csv_line(FIELDS))
+
+    def write(self, projects):
+        rows = [[project.get(field) for field in FIELDS] for project in projects]
+        if self.csv:
+            text = "".join(_csv_line(row) for row in rows)
+        else:
+            text = "".join(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
+        self.file.write(text)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _csv_line(row):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(row)
+    return buffer.getvalue()
+
+
+def _drop_last_page(path, csv_format: bool):
+    if not path.exists():
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        # a half-written last line goes first, then the rest of its page
+        lines = data[:data.rfind(b"\n") + 1].splitlines(keepends=True)
+        keep = len(lines)
+        last_page = None
+        while keep > (1 if csv_format else 0):
+            page = _page_of(lines[keep - 1].decode("utf-8"), csv_format)
+            if last_page is not None and page != last_page:
+                break
+            last_page = page
+            keep -= 1
+        f.truncate(sum(len(line) for line in lines[:keep]))
+
+
+def _page_of(line: str, csv_format: bool):
+    if csv_format:
+        row = next(csv.reader([line]))
+        return int(row[0]), int(row[1])
+    project = json.loads(line)
+    return project["year"], project["page"]
+
+
+def read_results(path):
+    """
+    Read back the projects a ResultWriter wrote, or [] if there is no file.
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    # ignore a half-written last line
+    text = text[:text.rfind("\n") + 1]
+
+    projects = []
+    if path.suffix.lower() == ".csv":
+        for row in csv.DictReader(io.StringIO(text)):
+            row["year"], row["page"], row["likes"] = int(row["year"]), int(row["page"]), int(row["likes"])
+            row["url"] = row["url"] or None
+            row["winner"] = row["winner"] == "True"
+            projects.append(row)
+    else:
+        for line in text.splitlines():
+            if line.strip():
+                projects.append(json.loads(line))
+    return projects
+
+
+class TopK:
+    """
+    Keep the k projects with the most likes seen so far in a min-heap,
+    instead of holding and sorting every project. Ties keep the project
+    seen first, like a stable sort would.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap = []
+        self._seen = 0
+
+    def add(self, project):
+        item = (project["likes"], -self._seen, project)
+        self._seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def ranked(self):
+        return [project for _, _, project in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
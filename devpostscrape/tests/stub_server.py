@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "fixtures"
+EMPTY_PAGE = b"<!DOCTYPE html><html><body><div class='row' id='submission-gallery'></div></body></html>"
+
+
+class GalleryStub:
+    """
+    Local stand-in for the Devpost galleries, serving fixtures/<year>-<page>.html
+    at http://127.0.0.1:<port>/<year>/project-gallery?page=<page>.
+
+    Pages past a year's last fixture are empty galleries and years without
+    fixtures are 404s, like the real site. The first `throttle` requests
+    for every URL are answered with 429 and Retry-After: 0. Responses carry
+    an ETag and honour If-None-Match.
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, throttle: int = 0):
+        self.pages = {}
+        for path in Path(fixture_dir).glob("*.html"):
+            year, page = (int(part) for part in path.stem.split("-"))
+            self.pages[year, page] = path.read_bytes()
+        self.years = {year for year, _ in self.pages}
+        self.throttle = throttle
+        self.hits = Counter()
+        self.throttled = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/{{year}}/project-gallery?page={{page}}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status: int, body: bytes = b"", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                year = int(url.path.strip("/").split("/")[0])
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+                with stub.lock:
+                    stub.hits[year, page] += 1
+                    throttled = stub.hits[year, page] <= stub.throttle
+                    stub.throttled += throttled
+                if throttled:
+                    return self.reply(429, headers={"Retry-After": "0"})
+                if year not in stub.years:
+                    return self.reply(404)
+
+                body = stub.pages.get((year, page), EMPTY_PAGE)
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    with stub.lock:
+                        stub.not_modified += 1
+                    return self.reply(304, headers={"ETag": etag})
+                self.reply(200, body, {"Content-Type": "text/html; charset=utf-8", "ETag": etag})
+
+        return Handler
+
+    def projects(self):
+        """
+        Every project in the fixtures, as scrape_all should return them.
+        """
+        from parse import parse_projects
+
+        projects = []
+        for (year, page), body in self.pages.items():
+            for project in parse_projects(body.decode("utf-8"), year):
+                project["page"] = page
+                projects.append(project)
+        return projects
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
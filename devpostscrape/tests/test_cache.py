@@ -0,0 +1,72 @@
+import json
+import time
+
+import pytest
+
+import main
+from fetch import Fetcher
+from stub_server import GalleryStub
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = GalleryStub()
+    monkeypatch.setattr(main, "BASE_URL", stub.base_url)
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return Fetcher(rate=0, retries=0, cache_dir=tmp_path)
+
+
+def set_checked_at(fetcher, year, page, checked_at):
+    meta_path = fetcher.cache._paths(main.BASE_URL.format(year=year, page=page))[1]
+    meta = json.loads(meta_path.read_text())
+    meta["checked_at"] = checked_at
+    meta_path.write_text(json.dumps(meta))
+
+
+def test_page_fetched_after_year_end_is_kept(stub, fetcher):
+    html = main.fetch_page(2016, 1, fetcher)
+    assert main.fetch_page(2016, 1, fetcher) == html
+    assert stub.hits[2016, 1] == 1
+    assert fetcher.cache_hits == 1
+
+
+def test_page_fetched_during_the_year_is_revalidated(stub, fetcher):
+    html = main.fetch_page(2016, 1, fetcher)
+    set_checked_at(fetcher, 2016, 1, main.year_end(2016) - 86400)
+
+    assert main.fetch_page(2016, 1, fetcher) == html
+    assert stub.hits[2016, 1] == 2
+    assert stub.not_modified == 1
+
+    # the 304 confirmed it after the year ended
+    assert main.fetch_page(2016, 1, fetcher) == html
+    assert stub.hits[2016, 1] == 2
+
+
+def test_missing_gallery_is_not_kept(stub, fetcher):
+    assert main.fetch_page(2015, 1, fetcher) == ""
+    assert main.fetch_page(2015, 1, fetcher) == ""
+    assert stub.hits[2015, 1] == 2
+    assert fetcher.cache_hits == 0
+
+
+def test_current_year_is_revalidated(stub, fetcher):
+    url = main.BASE_URL.format(year=2020, page=1)
+    fetcher.get(url, immutable_after=time.time() + 3600)
+    resp = fetcher.get(url, immutable_after=time.time() + 3600)
+    assert resp.from_cache
+    assert stub.hits[2020, 1] == 2
+    assert fetcher.not_modified == 1
+
+
+def test_max_age(stub, fetcher):
+    url = main.BASE_URL.format(year=2020, page=1)
+    fetcher.get(url)
+    assert fetcher.get(url, max_age=60).from_cache
+    assert fetcher.get(url, max_age=float("inf")).from_cache
+    assert stub.hits[2020, 1] == 1
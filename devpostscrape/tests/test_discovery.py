@@ -0,0 +1,89 @@
+import requests
+
+import main
+from fetch import Fetcher, FetchError
+
+ENTRY = """
+<a href="https://devpost.com/software/{name}"><div class="software-entry">
+  <h5>{name}</h5><p class="small tagline">Tagline</p>
+  <span class="count like-count">{likes}</span>
+</div></a>"""
+
+
+def gallery(year: int, page: int, pages: int, pagination: bool):
+    if page > pages:
+        return "<html><body><div class='row'></div></body></html>"
+    entries = "".join(ENTRY.format(name=f"p{year}-{page}-{i}", likes=page * 10 + i) for i in range(3))
+    nav = ""
+    if pagination:
+        nav = "<ul class='pagination'>" + "".join(f"<li><a>{p}</a></li>" for p in range(1, pages + 1)) + "</ul>"
+    return f"<html><body>{entries}{nav}</body></html>"
+
+
+class FakeFetcher(Fetcher):
+    """
+    Fetcher answering from generated galleries; page 1 of a year in
+    page_one_failures fails that many times before it works.
+    """
+
+    def __init__(self, pages: dict, pagination=True, page_one_failures=None):
+        super().__init__(rate=0, retries=0)
+        self.pages = pages
+        self.pagination = pagination
+        self.page_one_failures = dict(page_one_failures or {})
+        self.seen = []
+
+    def _request(self, url: str, **kwargs):
+        year, page = (int(part) for part in url.split("/"))
+        self.seen.append((year, page))
+        if page == 1 and self.page_one_failures.get(year, 0):
+            self.page_one_failures[year] -= 1
+            raise FetchError(f"{url}: HTTP 503")
+        resp = requests.Response()
+        resp.url = url
+        if year not in self.pages:
+            resp.status_code = 404
+            resp._content = b""
+        else:
+            resp.status_code = 200
+            resp._content = gallery(year, page, self.pages[year], self.pagination).encode()
+        resp.encoding = "utf-8"
+        return resp
+
+
+def scrape(monkeypatch, fetcher, years):
+    monkeypatch.setattr(main, "BASE_URL", "{year}/{page}")
+    stats = {}
+    projects = main.scrape_all(years=years, stats=stats, fetcher=fetcher, parse_processes=False)
+    return projects, stats
+
+
+def test_discovery_uses_pagination(monkeypatch):
+    fetcher = FakeFetcher({2020: 4, 2021: 1})
+    projects, stats = scrape(monkeypatch, fetcher, [2019, 2020, 2021])
+    assert len(projects) == 3 * 5
+    assert stats["requests"] == 3 + 3
+    assert stats["failed"] == []
+
+
+def test_discovery_without_pagination(monkeypatch):
+    fetcher = FakeFetcher({2020: 5}, pagination=False)
+    projects, stats = scrape(monkeypatch, fetcher, [2020])
+    assert {p["page"] for p in projects} == {1, 2, 3, 4, 5}
+    assert stats["requests"] < main.BLIND_PAGES
+
+
+def test_failed_first_page_falls_back_to_blind_range(monkeypatch):
+    fetcher = FakeFetcher({2020: 4}, page_one_failures={2020: 1})
+    projects, stats = scrape(monkeypatch, fetcher, [2020])
+    assert {p["page"] for p in projects} == {1, 2, 3, 4}
+    assert len(projects) == 12
+    assert stats["failed"] == []
+    assert stats["requests"] == 1 + main.BLIND_PAGES
+
+
+def test_year_that_cannot_be_fetched_is_reported(monkeypatch):
+    fetcher = FakeFetcher({2020: 2, 2021: 2}, page_one_failures={2020: 2})
+    projects, stats = scrape(monkeypatch, fetcher, [2020, 2021])
+    assert stats["failed"] == [(2020, 1)]
+    assert {(p["year"], p["page"]) for p in projects} == {(2020, 2), (2021, 1), (2021, 2)}
@@ -0,0 +1,38 @@
+import pytest
+
+import parse
+from bench_parse import load_fixtures
+
+FIXTURES = load_fixtures()
+
+
+def test_fixtures_are_committed():
+    assert {year for year, _ in FIXTURES} == {2016, 2020, 2024}
+
+
+@pytest.mark.parametrize("year,html", FIXTURES)
+def test_parsers_agree(year, html):
+    projects, last = parse.parse_page(html, year)
+    assert projects
+    assert (projects, last) == parse.parse_page_soup(html, year)
+
+
+def test_fixture_details():
+    pages = {}
+    for year, html in FIXTURES:
+        projects, last = parse.parse_page(html, year)
+        pages.setdefault(year, []).append((projects, last))
+
+    assert [last for _, last in pages[2020]] == [3, 3, 3]
+    assert pages[2024] == [(pages[2024][0][0], None)]
+    assert sum(len(projects) for projects, _ in pages[2020]) == 60
+
+    projects = [project for year_pages in pages.values() for found, _ in year_pages for project in found]
+    assert any(project["winner"] for project in projects)
+    assert any(project["likes"] == 0 for project in projects)
+    assert any("✨" in project["name"] for project in projects)
+    assert all(project["url"].startswith("https://devpost.com/software/") for project in projects)
+
+
+def test_empty_page():
+    assert parse.parse_page("  ", 2020) == ([], None)
@@ -0,0 +1,108 @@
+import json
+import time
+
+import pytest
+
+import main
+from fetch import Fetcher
+from stub_server import GalleryStub
+
+YEARS = [2015, 2016, 2020, 2024]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = GalleryStub(throttle=1)
+    monkeypatch.setattr(main, "BASE_URL", stub.base_url)
+    yield stub
+    stub.close()
+
+
+def fetcher(**kwargs):
+    options = dict(rate=0, retries=2, backoff=0.01)
+    options.update(kwargs)
+    return Fetcher(**options)
+
+
+def key(project):
+    return (project["year"], project["page"], project["url"])
+
+
+@pytest.mark.parametrize("discover", [True, False])
+@pytest.mark.parametrize("parse_processes", [False, True])
+def test_scrape_all_through_429s(stub, discover, parse_processes):
+    stats = {}
+    projects = main.scrape_all(years=YEARS, discover=discover, stats=stats, fetcher=fetcher(),
+                               parse_processes=parse_processes)
+
+    assert sorted(map(key, projects)) == sorted(map(key, stub.projects()))
+    assert [p["likes"] for p in projects] == sorted((p["likes"] for p in projects), reverse=True)
+    assert stats["failed"] == []
+    assert stats["retries"] == stub.throttled == len(stub.hits)
+    if discover:
+        # pagination gives 2016's and 2020's last page; 2024 has none, so
+        # page 2 is probed, and 2015 is a 404
+        assert set(stub.hits) == set(stub.pages) | {(2015, 1), (2024, 2)}
+    else:
+        assert stats["requests"] == len(YEARS) * main.BLIND_PAGES
+
+
+def test_pages_that_stay_throttled_are_reported(stub):
+    stub.throttle = 10
+    stats = {}
+    projects = main.scrape_all(years=[2016, 2020], stats=stats, fetcher=fetcher(retries=1))
+    assert projects == []
+    # without page 1 the whole blind range is tried, and fails
+    assert stats["failed"] == [(year, page) for year in (2016, 2020) for page in range(1, main.BLIND_PAGES + 1)]
+
+
+def test_cache_revalidates_with_etags(stub, tmp_path):
+    first = main.scrape_all(years=[2020], fetcher=fetcher(cache_dir=tmp_path))
+    stub.throttle = 0
+    stats = {}
+    again = main.scrape_all(years=[2020], stats=stats, fetcher=fetcher(cache_dir=tmp_path))
+    assert sorted(map(key, again)) == sorted(map(key, first))
+    # served from the cache, or revalidated against the ETag
+    assert stats["cached"] + stats["not_modified"] == 3
+
+
+def test_results_written_as_they_arrive(stub, tmp_path):
+    out = tmp_path / "projects.jsonl"
+    projects = main.scrape_all(years=YEARS, fetcher=fetcher(), out=out, parse_processes=True)
+    written = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert sorted(map(key, written)) == sorted(map(key, projects))
+
+
+class HeldFetcher(Fetcher):
+    """
+    Fetcher that holds back one URL until the output file has projects in
+    it (or a timeout passes), recording whether it did.
+    """
+
+    def __init__(self, held_url: str, out, **kwargs):
+        super().__init__(rate=0, retries=2, backoff=0.01, **kwargs)
+        self.held_url = held_url
+        self.out = out
+        self.written_first = None
+
+    def get(self, url: str, **kwargs):
+        if url == self.held_url:
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and not (self.out.exists() and self.out.stat().st_size):
+                time.sleep(0.02)
+            self.written_first = bool(self.out.exists() and self.out.stat().st_size)
+        return super().get(url, **kwargs)
+
+
+def test_process_pool_writes_pages_while_fetching(stub, tmp_path):
+    out = tmp_path / "projects.jsonl"
+    fetcher = HeldFetcher(stub.base_url.format(year=2016, page=1), out)
+    projects = main.scrape_all(years=YEARS, discover=False, fetcher=fetcher, out=out, parse_processes=True)
+    assert fetcher.written_first
+    assert sorted(map(key, projects)) == sorted(map(key, stub.projects()))
+
+
+def test_parse_pool_does_not_fork():
+    with main.start_parse_pool() as pool:
+        assert pool._mp_context.get_start_method() != "fork"
+        assert pool.submit(main.parse_projects, "", 2020).result() == []
@@ -0,0 +1,167 @@
+import hashlib
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# name -> (source column, aggregation) for pandas named aggregation
+METRICS = {
+    'minutes': ('minutes_played', 'sum'),
+    'plays': ('ms_played', 'size'),
+    'skips': ('is_skip', 'sum'),
+    'skip_rate': ('is_skip', 'mean'),
+    'unique_tracks': ('spotify_track_uri', 'nunique'),
+    'unique_artists': ('track_artist', 'nunique'),
+    'unique_albums': ('album_name', 'nunique')
+}
+
+# id(df) -> {'ref': weakref, 'version': token,
+#            'results': {grouping: ({column: token of what it read}, DataFrame)}}
+_memo = {}
+
+def _version(df):
+    """
+    Cheap token that changes when the rows of a frame change. Adding new
+    columns (e.g. week_number in the notebook) does not affect it.
+    """
+    if df.empty:
+        return (0,)
+    return (len(df), int(df['ms_played'].sum()), df['ts'].iloc[0], df['ts'].iloc[-1])
+
+def _columns(grouping, metrics):
+    keys = [] if grouping == () else [grouping] if isinstance(grouping, str) else list(grouping)
+    return set(keys) | {METRICS[m][0] for m in metrics}
+
+def _copy_on_write():
+    """
+    Whether pandas copies a column before editing it in place: always from
+    pandas 3, and on pandas 2 only with pd.options.mode.copy_on_write = True.
+    """
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+def _checksum(series):
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return str(series.dtype), hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+def _token(series):
+    """
+    What a cached result remembers about a column it read. With
+    copy-on-write that is the Series itself: holding on to it makes pandas
+    copy the column before any edit, so an edited or replaced column no
+    longer shares data with it, and checking that costs nothing. Without
+    copy-on-write, edits like df.loc[i, col] = v happen in the shared
+    array, so a checksum of the values is kept instead.
+    """
+    return series if _copy_on_write() else _checksum(series)
+
+def _unchanged(token, series):
+    if not isinstance(token, pd.Series):
+        return token == _checksum(series)
+    if token.array is series.array:
+        return True
+    if isinstance(token.dtype, np.dtype) and isinstance(series.dtype, np.dtype):
+        return token.dtype == series.dtype and np.may_share_memory(token.to_numpy(copy=False), series.to_numpy(copy=False))
+    return False
+
+def _fresh(df, read):
+    return all(column in df.columns and _unchanged(token, df[column]) for column, token in read.items())
+
+def _entry(df):
+    key = id(df)
+    entry = _memo.get(key)
+    if entry is None or entry['ref']() is not df or entry['version'] != _version(df):
+        entry = {'ref': weakref.ref(df, lambda _: _memo.pop(key, None)),
+                 'version': _version(df), 'results': {}}
+        _memo[key] = entry
+    return entry
+
+def _normalize(grouping):
+    if isinstance(grouping, str):
+        return grouping
+    return tuple(grouping)
+
+def aggregate(df, groupings, metrics=('minutes', 'plays')):
+    """
+    Compute several metrics for one or more groupings of a preprocessed frame.
+    
+    Each grouping (a column name, or a tuple of column names) is computed
+    with a single groupby that produces all requested metrics together.
+    Results are memoized per frame, so later calls for the same grouping
+    only compute metrics that are not cached yet; a result is recomputed
+    when a column it read has been replaced or edited. A grouping of () gives
+    whole-frame totals as a one-row frame.
+    
+    Returns a DataFrame when one grouping is passed as a string or tuple,
+    and a dict of DataFrames keyed by grouping when a list is passed.
+    skip_rate is a percentage.
+    """
+    single = isinstance(groupings, (str, tuple))
+    groupings = [groupings] if single else list(groupings)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}, expected some of {list(METRICS)}")
+    
+    results = _entry(df)['results']
+    out = {}
+    for grouping in groupings:
+        grouping = _normalize(grouping)
+        read, cached = results.get(grouping, ({}, None))
+        # Columns edited in place since (e.g. df['track_artist'] = ...)
+        if cached is not None and not _fresh(df, read):
+            read, cached = {}, None
+        missing = [m for m in metrics if cached is None or m not in cached.columns]
+        if missing:
+            computed = _compute(df, grouping, missing)
+            cached = computed if cached is None else cached.join(computed)
+            read = {**read, **{column: _token(df[column]) for column in _columns(grouping, missing)}}
+            results[grouping] = (read, cached)
+        out[grouping] = cached[list(metrics)]
+    
+    return out[_normalize(groupings[0])] if single else out
+
+def _compute(df, grouping, metrics):
+    spec = {name: METRICS[name] for name in metrics}
+    if grouping == ():
+        row = {name: len(df) if func == 'size' else df[column].agg(func)
+               for name, (column, func) in spec.items()}
+        return _finish(pd.DataFrame(row, index=['total']))
+    
+    keys = [grouping] if isinstance(grouping, str) else list(grouping)
+    return df.groupby(keys, observed=True, sort=True).agg(**spec).pipe(_finish)
+
+def _finish(result):
+    if 'skip_rate' in result.columns:
+        result['skip_rate'] = result['skip_rate'].astype(float) * 100
+    return result
+
+def top(df, grouping, metric='minutes', n=10):
+    """
+    Return the n largest groups of a grouping by one metric.
+    """
+    return aggregate(df, grouping, (metric,))[metric].nlargest(n)
+
+def per_group_over_time(df, column, values, time_column='date', metric='minutes'):
+    """
+    Return {value: Series over time_column} for a few values of a column,
+    from one cached (column, time_column) groupby instead of filtering the
+    frame once per value.
+    """
+    by_time = aggregate(df, (column, time_column), (metric,))[metric]
+    series = {}
+    for value in values:
+        try:
+            series[value] = by_time.xs(value, level=0)
+        except KeyError:
+            series[value] = by_time.iloc[:0].droplevel(0)
+    return series
+
+def clear_cache(df=None):
+    """
+    Forget memoized results for one frame, or for all frames.
+    """
+    if df is None:
+        _memo.clear()
+    else:
+        _memo.pop(id(df), None)
@@ -0,0 +1,227 @@
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import data_loader
+from profiling import _peak_rss_bytes, _rss_bytes, _reset_peak_rss, set_verbosity
+from synthetic import generate_records, write_history
+
+BENCH_DIR = Path(__file__).parent / '.bench'
+
+def _parse(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+# Each stage takes the previous stage's result
+STAGES = [
+    ('parse', _parse),
+    ('dataframe', pd.DataFrame),
+    ('to_datetime', data_loader.convert_timestamps),
+    ('time_columns', data_loader.add_time_columns),
+    ('media_info', data_loader.add_media_columns),
+    ('sessions', data_loader.add_session_ids),
+    ('summary', data_loader.get_data_summary)
+]
+
+def run_pipeline(path):
+    """
+    Run every stage once, recording its wall time.
+    """
+    results = {}
+    value = path
+    for name, func in STAGES:
+        gc.collect()
+        start = time.perf_counter()
+        value = func(value)
+        results[name] = {'seconds': round(time.perf_counter() - start, 4)}
+    return results
+
+def measure_stage(path, stage):
+    """
+    Run the stages before stage, then record how far stage itself pushes
+    the resident set size above where it started (peak_mb) and how much
+    of that it keeps (retained_mb). RSS includes the pyarrow and numpy
+    buffers that tracemalloc never sees. Meant to run in a fresh process
+    per stage, see measure_pipeline.
+    """
+    value = path
+    for name, func in STAGES:
+        if name == stage:
+            break
+        value = func(value)
+    else:
+        raise ValueError(f"Unknown stage {stage!r}")
+    
+    gc.collect()
+    _reset_peak_rss()
+    start = _rss_bytes()
+    value = func(value)
+    peak = max(_peak_rss_bytes(), _rss_bytes())
+    return {
+        'peak_mb': round((peak - start) / 1e6, 1),
+        'retained_mb': round((_rss_bytes() - start) / 1e6, 1)
+    }
+
+def measure_pipeline(path):
+    """
+    Measure every stage's memory in its own subprocess, so one stage's
+    freed-but-not-returned memory and high-water mark don't leak into the
+    next one's numbers.
+    """
+    results = {}
+    for name, _ in STAGES:
+        child = subprocess.run([sys.executable, str(Path(__file__).resolve()), '--measure-stage', name, str(path)],
+                               capture_output=True, text=True, check=True)
+        results[name] = json.loads(child.stdout.strip().splitlines()[-1])
+    return results
+
+def media_info_rowwise(df):
+    """
+    The row-wise apply that resolve_media_info replaced, kept as the
+    reference it is checked and timed against.
+    """
+    def get_media_info(row):
+        if pd.notna(row['master_metadata_track_name']):
+            return {
+                'media_type': 'song',
+                'title': row['master_metadata_track_name'],
+                'artist': row['master_metadata_album_artist_name'] if pd.notna(row['master_metadata_album_artist_name']) else 'Unknown Artist',
+                'album': row['master_metadata_album_album_name'] if pd.notna(row['master_metadata_album_album_name']) else 'Unknown Album'
+            }
+        elif pd.notna(row['episode_name']):
+            return {
+                'media_type': 'podcast',
+                'title': row['episode_name'],
+                'artist': row['episode_show_name'] if pd.notna(row['episode_show_name']) else 'Unknown Podcast',
+                'album': 'Podcast Episode'
+            }
+        elif pd.notna(row['audiobook_title']):
+            return {
+                'media_type': 'audiobook',
+                'title': row['audiobook_chapter_title'] if pd.notna(row['audiobook_chapter_title']) else row['audiobook_title'],
+                'artist': row['audiobook_title'],
+                'album': 'Audiobook'
+            }
+        else:
+            return {
+                'media_type': 'unknown',
+                'title': 'Unknown Content',
+                'artist': 'Unknown',
+                'album': 'Unknown'
+            }
+    
+    return df.apply(get_media_info, axis=1, result_type='expand')
+
+def benchmark_media_info(rows, seed=0):
+    """
+    Time the row-wise reference against resolve_media_info on a synthetic
+    history, and check that all four columns agree.
+    """
+    df = pd.DataFrame(list(generate_records(rows, seed)))
+    print(f"\nmedia info, {rows:,} rows")
+    
+    start = time.perf_counter()
+    expected = media_info_rowwise(df)
+    rowwise = time.perf_counter() - start
+    start = time.perf_counter()
+    resolved = data_loader.resolve_media_info(df)
+    vectorized = time.perf_counter() - start
+    
+    for column in ['media_type', 'title', 'artist', 'album']:
+        if resolved[column].tolist() != expected[column].tolist():
+            raise AssertionError(f"resolve_media_info disagrees with the row-wise version on {column}")
+    print(f"  row-wise apply     {rowwise:8.3f}s")
+    print(f"  resolve_media_info {vectorized:8.3f}s  ({rowwise / vectorized:.0f}x faster, columns identical)")
+    return {'rows': rows, 'rowwise_seconds': round(rowwise, 4), 'vectorized_seconds': round(vectorized, 4)}
+
+def benchmark(rows, seed=0):
+    """
+    Time every load/preprocess/summary stage on a synthetic history of the
+    given size, generating (and keeping) the input file on first use.
+    """
+    BENCH_DIR.mkdir(exist_ok=True)
+    path = BENCH_DIR / f"synthetic_{rows}_{seed}.json"
+    if not path.exists():
+        print(f"Generating {rows:,} synthetic records...")
+        write_history(path, rows, seed)
+    
+    print(f"\n{rows:,} rows ({path.stat().st_size / 1e6:.0f} MB JSON)")
+    timings = run_pipeline(path)
+    memory = measure_pipeline(path)
+    
+    stages = []
+    for name, timing in timings.items():
+        stages.append({'stage': name, **timing, **memory[name]})
+        print(f"  {name:<16} {timing['seconds']:8.3f}s  peak {memory[name]['peak_mb']:8.1f} MB")
+    
+    return {'rows': rows, 'seed': seed, 'stages': stages}
+
+def compare(report, baseline, tolerance):
+    """
+    Return a list of regressions: stages slower, or using more memory, than
+    the baseline run of the same size by more than tolerance.
+    """
+    regressions = []
+    previous = {(run['rows'], s['stage']): s for run in baseline['runs'] for s in run['stages']}
+    for run in report['runs']:
+        for stage in run['stages']:
+            old = previous.get((run['rows'], stage['stage']))
+            if old is None:
+                continue
+            for key, floor in (('seconds', 0.05), ('peak_mb', 5.0)):
+                if stage[key] > old[key] * (1 + tolerance) and stage[key] - old[key] > floor:
+                    regressions.append(f"{run['rows']:,} rows / {stage['stage']}: {key} {old[key]} -> {stage[key]}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Spotify data loading stages on synthetic histories.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[100_000, 1_000_000],
+                        help="history sizes to run (10000000 is supported but slow to generate)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown or memory growth before a stage counts as a regression")
+    parser.add_argument("--media-info", action="store_true",
+                        help="only compare resolve_media_info with the row-wise apply it replaced, at each --rows size")
+    parser.add_argument("--measure-stage", nargs=2, metavar=('STAGE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure_stage:
+        set_verbosity(quiet=True)
+        print(json.dumps(measure_stage(args.measure_stage[1], args.measure_stage[0])))
+        sys.exit(0)
+    
+    if args.media_info:
+        for rows in args.rows:
+            benchmark_media_info(rows, args.seed)
+        sys.exit(0)
+    
+    report = {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'runs': [benchmark(rows, args.seed) for rows in args.rows]
+    }
+    
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to: {args.out}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
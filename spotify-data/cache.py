@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from profiling import logger
+
+CACHE_DIR_NAME = '.spotify_cache'
+
+def cache_paths(json_file_path, variant=None):
+    """
+    Return the (data, metadata) cache file paths for a source JSON file.
+    The cache lives in a hidden directory next to the source. A variant
+    (e.g. 'compact') gets its own pair of files.
+    """
+    source = Path(json_file_path)
+    cache_dir = source.parent / CACHE_DIR_NAME
+    name = f"{source.stem}.{variant}" if variant else source.stem
+    return cache_dir / f"{name}.feather", cache_dir / f"{name}.meta.json"
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Hash a file's contents in fixed-size chunks.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint(json_file_path, with_hash=True):
+    """
+    Describe a source file by path, size, mtime and (optionally) content hash.
+    """
+    path = Path(json_file_path).resolve()
+    stat = path.stat()
+    return {
+        'path': str(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': file_hash(path) if with_hash else None
+    }
+
+def load_cached(json_file_path, version, variant=None):
+    """
+    Return the cached preprocessed DataFrame for a source file, or None if
+    there is no cache or it no longer matches the source or version.
+
+    Path, size and mtime are checked first. The content hash is only
+    recomputed when the mtime moved, so a touched but unchanged file still
+    hits the cache without paying for a hash on every warm start.
+    """
+    data_path, meta_path = cache_paths(json_file_path, variant)
+    if not data_path.exists() or _current_meta(json_file_path, meta_path, version) is None:
+        return None
+
+    try:
+        return pd.read_feather(data_path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache {data_path}: {e}")
+        return None
+
+def _current_meta(json_file_path, meta_path, version):
+    """
+    Return the metadata stored at meta_path if it still matches the source
+    file and version, otherwise None.
+    """
+    if not meta_path.exists():
+        return None
+
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    current = fingerprint(json_file_path, with_hash=False)
+    cached = meta.get('source', {})
+    if meta.get('version') != version:
+        return None
+    if cached.get('path') != current['path'] or cached.get('size') != current['size']:
+        return None
+    if cached.get('mtime_ns') != current['mtime_ns']:
+        if file_hash(json_file_path) != cached.get('hash'):
+            return None
+        meta['source']['mtime_ns'] = current['mtime_ns']
+        _write_meta(meta_path, meta)
+    return meta
+
+def save_cached(df, json_file_path, version, variant=None, source=None):
+    """
+    Store a preprocessed DataFrame in the columnar cache for a source file.
+    Pass source to reuse a fingerprint that was already computed.
+    Failures are reported but never raised, the cache is only an optimisation.
+    """
+    data_path, meta_path = cache_paths(json_file_path, variant)
+    try:
+        data_path.parent.mkdir(exist_ok=True)
+        tmp_path = data_path.with_suffix('.tmp')
+        df.reset_index(drop=True).to_feather(tmp_path)
+        os.replace(tmp_path, data_path)
+        _write_meta(meta_path, {
+            'version': version,
+            'source': source or fingerprint(json_file_path)
+        })
+    except Exception as e:
+        logger.warning(f"Could not write cache {data_path}: {e}")
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+def partition_dir(json_file_path, variant=None):
+    """
+    Return the directory holding the year partitions of a source file.
+    """
+    data_path, _ = cache_paths(json_file_path, variant)
+    return data_path.with_suffix('.years')
+
+def save_partitioned(df, json_file_path, version, variant=None, source=None):
+    """
+    Store a preprocessed DataFrame as one feather file per year (of the year
+    column), with each partition's first and last timestamp in the metadata
+    so readers can skip partitions without opening them.
+    Like save_cached, failures are reported but never raised.
+    """
+    part_dir = partition_dir(json_file_path, variant)
+    try:
+        part_dir.mkdir(parents=True, exist_ok=True)
+        for old in part_dir.glob('*.feather'):
+            old.unlink()
+        partitions = []
+        for year, part in df.groupby('year', sort=True):
+            name = f"{int(year)}.feather"
+            part.reset_index(drop=True).to_feather(part_dir / name)
+            partitions.append({
+                'file': name,
+                'year': int(year),
+                'rows': len(part),
+                'min_ts': part['ts'].min().isoformat(),
+                'max_ts': part['ts'].max().isoformat()
+            })
+        _write_meta(part_dir / 'meta.json', {
+            'version': version,
+            'source': source or fingerprint(json_file_path),
+            'partitions': partitions
+        })
+    except Exception as e:
+        logger.warning(f"Could not write partitions {part_dir}: {e}")
+
+def load_partitioned(json_file_path, version, variant=None, years=None, start=None, end=None):
+    """
+    Read only the year partitions that can hold rows for the given years
+    and the [start, end] timestamp range, concatenated in time order.
+    Returns None if there are no partitions or they are out of date.
+    Rows are not filtered within a partition.
+    """
+    part_dir = partition_dir(json_file_path, variant)
+    meta = _current_meta(json_file_path, part_dir / 'meta.json', version)
+    if meta is None:
+        return None
+
+    wanted = []
+    for part in meta['partitions']:
+        if years is not None and part['year'] not in years:
+            continue
+        if start is not None and pd.Timestamp(part['max_ts']) < start:
+            continue
+        if end is not None and pd.Timestamp(part['min_ts']) > end:
+            continue
+        wanted.append(part)
+
+    try:
+        frames = [pd.read_feather(part_dir / part['file']) for part in wanted]
+        if not frames and meta['partitions']:
+            # Nothing matches; read the first partition for its columns only.
+            frames = [pd.read_feather(part_dir / meta['partitions'][0]['file']).iloc[:0]]
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable partitions {part_dir}: {e}")
+        return None
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
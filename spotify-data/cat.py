@@ -1,12 +1,24 @@
+import argparse
 import json
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+OUTPUT_NAMES = {"combined_data.json", "combined_data.ndjson"}
+
+def find_input_files(directory):
+    """
+    Return the export files to combine, skipping our own output files.
+    """
+    return sorted(p for p in Path(directory).glob("*.json") if p.name not in OUTPUT_NAMES)
+
 def combine_json_files():
     current_dir = Path(__file__).parent
     combined_data = []
     
-    json_files = list(current_dir.glob("*.json"))
+    json_files = find_input_files(current_dir)
     
     if not json_files:
         print("No JSON files found in the current directory")
@@ -44,5 +56,147 @@ def combine_json_files():
     except Exception as e:
         print(f"Error writing combined file: {e}")
 
+def iter_json_records(path, chunk_size=1 << 16):
+    """
+    Yield records from a JSON file one at a time without loading it whole.
+    Elements of a top-level array are yielded individually; any other
+    top-level value is yielded as a single record.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = 0
+        
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        
+        if pos >= len(buf):
+            return
+        if buf[pos] != '[':
+            yield json.loads(buf[pos:] + f.read())
+            return
+        pos += 1
+        
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            
+            if pos < len(buf):
+                try:
+                    record, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # A value is only complete once the ',' or ']' after it is
+                    # in the buffer: a number cut off as "1." still decodes as 1.
+                    after = end
+                    while after < len(buf) and buf[after].isspace():
+                        after += 1
+                    if eof or (after < len(buf) and buf[after] in ',]'):
+                        yield record
+                        pos = end
+                        continue
+            elif eof:
+                raise json.JSONDecodeError("Unterminated array", buf, pos)
+            
+            more = f.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+
+def write_ndjson(path, out):
+    """
+    Stream one export file into an open binary file as newline-delimited JSON.
+    Returns the number of records written.
+    """
+    count = 0
+    for record in iter_json_records(path):
+        out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        out.write(b'\n')
+        count += 1
+    return count
+
+def _convert_to_part(json_file, part_file):
+    try:
+        with open(part_file, 'wb') as out:
+            return write_ndjson(json_file, out), None
+    except Exception as e:
+        return 0, str(e)
+
+def stream_combine_json_files(directory=None, output_name="combined_data.ndjson", workers=1):
+    """
+    Combine export files into compact newline-delimited JSON, one record at a
+    time, so peak memory stays around a single record rather than the whole
+    export. With workers > 1 the input files are parsed in a process pool and
+    the per-file outputs are concatenated in file order.
+    """
+    current_dir = Path(directory) if directory else Path(__file__).parent
+    json_files = find_input_files(current_dir)
+    
+    if not json_files:
+        print("No JSON files found in the current directory")
+        return
+    
+    print(f"Found {len(json_files)} JSON files to combine:")
+    
+    output_file = current_dir / output_name
+    tmp_output = output_file.with_name(output_file.name + ".tmp")
+    total = 0
+    
+    with open(tmp_output, 'wb') as out:
+        if workers > 1:
+            part_dir = Path(tempfile.mkdtemp(dir=current_dir, prefix=".combine-"))
+            try:
+                parts = [part_dir / f"{i}.ndjson" for i in range(len(json_files))]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(_convert_to_part, json_files, parts))
+                
+                for json_file, part, (count, error) in zip(json_files, parts, results):
+                    print(f"Processing: {json_file.name}")
+                    if error:
+                        print(f"  Error reading {json_file.name}: {error}")
+                        continue
+                    with open(part, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+                    total += count
+                    print(f"  Added {count} items from {json_file.name}")
+            finally:
+                shutil.rmtree(part_dir, ignore_errors=True)
+        else:
+            for json_file in json_files:
+                print(f"Processing: {json_file.name}")
+                start = out.tell()
+                try:
+                    count = write_ndjson(json_file, out)
+                    total += count
+                    print(f"  Added {count} items from {json_file.name}")
+                except Exception as e:
+                    # Drop whatever this file wrote before it failed.
+                    out.seek(start)
+                    out.truncate()
+                    print(f"  Error reading {json_file.name}: {e}")
+    
+    os.replace(tmp_output, output_file)
+    print(f"\nSuccessfully combined {total} total items")
+    print(f"Output saved to: {output_file}")
+
 if __name__ == "__main__":
-    combine_json_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Combine Spotify export JSON files.")
+    parser.add_argument("--stream", action="store_true",
+                        help="write compact NDJSON incrementally instead of one pretty-printed JSON array")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parse input files in this many processes (streaming mode only)")
+    args = parser.parse_args()
+    
+    if args.stream:
+        stream_combine_json_files(workers=args.workers)
+    else:
+        combine_json_files()
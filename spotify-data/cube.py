@@ -0,0 +1,201 @@
+from pathlib import Path
+
+import pandas as pd
+
+from cache import fingerprint, load_cached, save_cached
+
+# Bump whenever the rollup layout changes so saved cubes are rebuilt.
+CUBE_VERSION = 1
+
+# Daily rollups; every coarser time slice (week, month, year, weekday) is
+# derived from the date column at query time.
+ROLLUPS = {
+    'artist': ['date', 'track_artist'],
+    'track': ['date', 'spotify_track_uri', 'track_name', 'track_artist'],
+    'hour': ['date', 'hour']
+}
+
+MEASURES = ['ms_played', 'plays', 'skips']
+
+def _day(df):
+    """
+    The date column as datetime64, whichever form preprocess left it in.
+    """
+    if pd.api.types.is_datetime64_any_dtype(df['date']):
+        return df['date']
+    ts = df['ts'].dt.tz_localize(None) if df['ts'].dt.tz is not None else df['ts']
+    return ts.dt.normalize()
+
+def _rollup(df, keys):
+    rows = df.assign(date=_day(df))
+    return rows.groupby(keys, observed=True, sort=False, dropna=False).agg(
+        ms_played=('ms_played', 'sum'),
+        plays=('ms_played', 'size'),
+        skips=('is_skip', 'sum')
+    ).reset_index()
+
+def build_cube(df):
+    """
+    Roll a preprocessed frame up into small daily tables keyed by artist,
+    by track and by hour, holding ms_played, play and skip totals. These
+    sums are additive, so every query below is a filter and a regroup over
+    the rollup rather than over the raw rows.
+    """
+    return {name: _rollup(df, keys) for name, keys in ROLLUPS.items()}
+
+def add_to_cube(cube, new_rows):
+    """
+    Fold newly ingested rows into an existing cube. Only rollup rows on or
+    after the first new date are regrouped, so the cost follows the size of
+    the new data rather than the whole history.
+    """
+    if new_rows.empty:
+        return cube
+    
+    additions = build_cube(new_rows)
+    first_date = additions['hour']['date'].min()
+    updated = {}
+    for name, keys in ROLLUPS.items():
+        table = cube[name]
+        recent = table['date'] >= first_date
+        tail = pd.concat([table[recent], additions[name]], ignore_index=True)
+        tail = tail.groupby(keys, observed=True, sort=False, dropna=False)[MEASURES].sum().reset_index()
+        updated[name] = pd.concat([table[~recent], tail], ignore_index=True)
+    return updated
+
+def save_cube(cube, cube_dir):
+    cube_dir = Path(cube_dir)
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    for name, table in cube.items():
+        table.to_feather(cube_dir / f"{name}.feather")
+
+def load_cube(cube_dir):
+    """
+    Load a cube saved by save_cube, or return None if it is incomplete.
+    """
+    cube_dir = Path(cube_dir)
+    paths = {name: cube_dir / f"{name}.feather" for name in ROLLUPS}
+    if not all(path.exists() for path in paths.values()):
+        return None
+    return {name: pd.read_feather(path) for name, path in paths.items()}
+
+def _rows_key(df):
+    """
+    Cheap description of which rows a frame holds, so a cube cached for
+    the whole export is not handed back for a filtered frame (or the other
+    way round).
+    """
+    if df.empty:
+        return [0]
+    ts_hash = int(pd.util.hash_pandas_object(df['ts'], index=False).sum())
+    return [len(df), int(df['ms_played'].sum()), ts_hash]
+
+def cube_for(df, json_file_path='combined_data.json'):
+    """
+    Return the cube for a loaded export, reusing the copy cached next to
+    the JSON file while the file is unchanged and df holds the same rows
+    it was built from, or building and caching it. Without the JSON file
+    the cube is built and not cached.
+    """
+    if not Path(json_file_path).exists():
+        return build_cube(df)
+    
+    version = [CUBE_VERSION] + _rows_key(df)
+    cube = {}
+    for name in ROLLUPS:
+        table = load_cached(json_file_path, version, f"cube-{name}")
+        if table is None:
+            break
+        cube[name] = table
+    else:
+        return cube
+    
+    cube = build_cube(df)
+    try:
+        source = fingerprint(json_file_path)
+    except OSError:
+        return cube
+    for name, table in cube.items():
+        save_cached(table, json_file_path, version, f"cube-{name}", source)
+    return cube
+
+def _slice(table, year=None, start=None, end=None):
+    mask = pd.Series(True, index=table.index)
+    if year is not None:
+        mask &= table['date'].dt.year == year
+    if start is not None:
+        mask &= table['date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= table['date'] <= pd.Timestamp(end)
+    return table[mask]
+
+def _measure(grouped, metric):
+    if metric == 'minutes':
+        return (grouped['ms_played'].sum() / (1000 * 60)).rename(metric)
+    if metric == 'plays':
+        return grouped['plays'].sum().rename(metric)
+    if metric == 'skip_rate':
+        return (grouped['skips'].sum() / grouped['plays'].sum() * 100).rename(metric)
+    raise ValueError(f"Unknown metric {metric!r}, expected minutes, plays or skip_rate")
+
+def top_artists(cube, n=100, metric='minutes', year=None, start=None, end=None):
+    """
+    Return the n top artists by minutes or plays, optionally within a year
+    or a date range.
+    """
+    table = _slice(cube['artist'], year, start, end)
+    return _measure(table.groupby('track_artist', observed=True), metric).nlargest(n)
+
+def top_tracks(cube, n=100, metric='minutes', year=None, start=None, end=None):
+    """
+    Return the n top (track_name, track_artist) pairs by minutes or plays.
+    """
+    table = _slice(cube['track'], year, start, end)
+    return _measure(table.groupby(['track_name', 'track_artist'], observed=True), metric).nlargest(n)
+
+def daily_by_artist(cube, artists, metric='minutes', cumulative=False, year=None, start=None, end=None):
+    """
+    Return a date-indexed frame with one column per artist.
+    """
+    table = _slice(cube['artist'], year, start, end)
+    table = table[table['track_artist'].isin(list(artists))]
+    daily = _measure(table.groupby(['date', 'track_artist'], observed=True), metric).unstack(fill_value=0)
+    daily = daily.reindex(columns=list(artists), fill_value=0)
+    return daily.cumsum() if cumulative else daily
+
+PERIODS = {
+    'day': lambda dates: dates,
+    'week': lambda dates: dates.dt.to_period('W'),
+    'month': lambda dates: dates.dt.to_period('M'),
+    'year': lambda dates: dates.dt.year,
+    'weekday': lambda dates: dates.dt.day_name(),
+    'month_name': lambda dates: dates.dt.month_name()
+}
+
+def listening_by(cube, period='day', metric='minutes', year=None, start=None, end=None):
+    """
+    Return minutes, plays or skip rate per day, week, month, year, weekday,
+    month_name or hour of day.
+    """
+    table = _slice(cube['hour'], year, start, end)
+    if period == 'hour':
+        return _measure(table.groupby('hour'), metric)
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period {period!r}, expected hour or one of {list(PERIODS)}")
+    return _measure(table.groupby(PERIODS[period](table['date'])), metric)
+
+def summary(cube, year=None, start=None, end=None):
+    """
+    Headline numbers for a year or date range, without touching raw rows.
+    """
+    hours = _slice(cube['hour'], year, start, end)
+    tracks = _slice(cube['track'], year, start, end)
+    artists = _slice(cube['artist'], year, start, end)
+    plays = int(hours['plays'].sum())
+    return {
+        'records': plays,
+        'minutes': hours['ms_played'].sum() / (1000 * 60),
+        'unique_tracks': tracks['spotify_track_uri'].nunique(),
+        'unique_artists': artists['track_artist'].nunique(),
+        'skip_rate': hours['skips'].sum() / plays * 100 if plays else 0.0
+    }
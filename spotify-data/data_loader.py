@@ -2,33 +2,247 @@ import pandas as pd
 import json
 from datetime import datetime
 import numpy as np
+from aggregates import aggregate
+from cache import load_cached, save_cached, load_partitioned, save_partitioned
+from profiling import logger, set_verbosity, new_report, stage, finish_report, dump_report
 
-def load_spotify_data(json_file_path='combined_data.json'):
+# Bump whenever preprocess_data changes its output so stale caches are rebuilt.
+PREPROCESS_VERSION = 1
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+DERIVED_COLUMNS = {
+    'minutes_played': 1000 * 60,
+    'seconds_played': 1000
+}
+
+# Report of the most recent load_spotify_data call, see get_load_report.
+_last_report = None
+
+def load_spotify_data(json_file_path='combined_data.json', use_cache=True, rebuild_cache=False,
+                      compact=False, derived_columns=('minutes_played',), quiet=False, verbose=False,
+                      report_path=None, years=None, date_range=None):
     """
     Load Spotify listening data from JSON file into a pandas DataFrame
-    with proper data types and preprocessing.
+    with proper data types and preprocessing. Files ending in .ndjson or
+    .jsonl are read as newline-delimited JSON, in chunks.
+    
+    The preprocessed frame is cached next to the JSON file and reused until
+    the file or PREPROCESS_VERSION changes. Pass rebuild_cache=True to force
+    a rebuild, or use_cache=False to bypass the cache entirely.
+    
+    years (a year or a list of years) and date_range (a (start, end) pair
+    of dates, inclusive, either end may be None) load only the matching
+    rows. The cache then also keeps one partition per year, and later
+    filtered loads read just the partitions they need, so one year costs
+    about one year of I/O and memory. The first filtered load still reads
+    the whole history to write the partitions.
+    
+    With compact=True the frame is shrunk by compact_frame and only the
+    derived columns named in derived_columns are added back, see
+    add_derived_columns. Groupbys over the resulting categoricals should
+    pass observed=True.
+    
+    Every stage of the load is timed and its rows and change in resident
+    memory recorded; get_load_report returns the result and report_path
+    writes it as JSON. quiet=True silences progress messages, verbose=True
+    adds a line per stage.
     """
-    print(f"Loading data from {json_file_path}...")
+    global _last_report
+    set_verbosity(quiet, verbose)
+    report = _last_report = new_report(json_file_path)
+    variant = 'compact' if compact else None
+    years, start, end = _row_filter(years, date_range)
+    filtered = years is not None or start is not None or end is not None
     
-    with open(json_file_path, 'r') as f:
-        data = json.load(f)
+    df = None
+    if filtered and use_cache and not rebuild_cache:
+        with stage(report, 'partition_read') as info:
+            df = load_partitioned(json_file_path, PREPROCESS_VERSION, variant, years, *_utc_bounds(start, end))
+            info['rows'] = None if df is None else len(df)
+        if df is not None:
+            report['cache'] = 'partitions'
+            logger.info(f"Loaded {len(df):,} listening records from year partitions")
     
-    df = pd.DataFrame(data)
+    if df is None:
+        df, before = _load_frame(json_file_path, use_cache, rebuild_cache, compact, report)
+        if filtered and use_cache:
+            with stage(report, 'partition_write', len(df)):
+                save_partitioned(df, json_file_path, PREPROCESS_VERSION, variant)
     
-    print(f"Loaded {len(df):,} listening records")
+    if filtered:
+        with stage(report, 'select_rows', len(df)):
+            df = select_rows(df, years, start, end)
+        before = None
+        logger.info(f"Selected {len(df):,} listening records")
     
-    df = preprocess_data(df)
+    if compact:
+        df = add_derived_columns(df, derived_columns)
+        if before is None:
+            logger.info(f"Memory usage: {memory_mb(df):.1f} MB")
+        else:
+            logger.info(f"Memory usage: {before:.1f} MB -> {memory_mb(df):.1f} MB")
     
+    _finish_load(report, report_path)
     return df
 
-def preprocess_data(df):
+def _load_frame(json_file_path, use_cache, rebuild_cache, compact, report):
     """
-    Clean and preprocess the Spotify data for analysis.
+    Return the whole preprocessed (and, with compact, compacted) frame from
+    the cache or by parsing the JSON file, along with its memory use before
+    compaction when it was compacted here, else None.
     """
-    print("Preprocessing data...")
+    variant = 'compact' if compact else None
+    if use_cache and not rebuild_cache:
+        with stage(report, 'cache_read') as info:
+            df = load_cached(json_file_path, PREPROCESS_VERSION, variant)
+            info['rows'] = None if df is None else len(df)
+        if df is not None:
+            report['cache'] = 'hit'
+            logger.info(f"Loaded {len(df):,} listening records from cache")
+            return df, None
+        report['cache'] = 'miss'
     
-    df['ts'] = pd.to_datetime(df['ts'])
+    logger.info(f"Loading data from {json_file_path}...")
+    
+    if str(json_file_path).endswith(('.ndjson', '.jsonl')):
+        # pd.read_json builds the frame chunk by chunk while it parses, so
+        # the two stages are recorded as one.
+        with stage(report, 'parse') as info:
+            df = read_ndjson(json_file_path)
+            info['rows'] = len(df)
+    else:
+        with stage(report, 'parse') as info:
+            with open(json_file_path, 'r') as f:
+                data = json.load(f)
+            info['rows'] = len(data)
+        
+        with stage(report, 'dataframe', len(data)):
+            df = pd.DataFrame(data)
+        del data
+    
+    logger.info(f"Loaded {len(df):,} listening records")
+    
+    df = preprocess_data(df, report)
+    
+    before = None
+    if compact:
+        before = memory_mb(df)
+        with stage(report, 'compact', len(df)):
+            df = compact_frame(df)
+    
+    if use_cache:
+        with stage(report, 'cache_write', len(df)):
+            save_cached(df, json_file_path, PREPROCESS_VERSION, variant)
+    
+    return df, before
+
+def _row_filter(years, date_range):
+    """
+    Normalise the years and date_range arguments of load_spotify_data to a
+    set of years (or None) and tz-naive start and end days (or None).
+    """
+    if years is not None:
+        years = {int(years)} if isinstance(years, (int, np.integer)) else {int(year) for year in years}
+    start, end = date_range if date_range is not None else (None, None)
+    return years, _as_day(start), _as_day(end)
+
+def _as_day(value):
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    if value.tz is not None:
+        value = value.tz_convert('UTC').tz_localize(None)
+    return value.normalize()
+
+def _utc_bounds(start, end):
+    """
+    Timestamp bounds covering the whole of the start and end days, for
+    skipping partitions. ts is parsed from the exports as UTC.
+    """
+    if start is not None:
+        start = start.tz_localize('UTC')
+    if end is not None:
+        end = (end + pd.Timedelta(days=1)).tz_localize('UTC')
+    return start, end
+
+def select_rows(df, years=None, start=None, end=None):
+    """
+    Keep the rows of a preprocessed frame in the given years and between
+    the start and end days, inclusive.
+    """
+    start, end = _as_day(start), _as_day(end)
+    mask = pd.Series(True, index=df.index)
+    if years is not None:
+        mask &= df['year'].isin(list(years))
+    if start is not None or end is not None:
+        ts = df['ts'].dt.tz_localize(None) if df['ts'].dt.tz is not None else df['ts']
+        days = ts.dt.normalize()
+        if start is not None:
+            mask &= days >= start
+        if end is not None:
+            mask &= days <= end
+    return df[mask].reset_index(drop=True)
+
+def _finish_load(report, report_path):
+    finish_report(report)
+    logger.debug(f"Load took {report['total_seconds']:.2f}s")
+    if report_path:
+        dump_report(report, report_path)
+        logger.info(f"Load report saved to: {report_path}")
+
+def get_load_report():
+    """
+    Return the stage report of the last load_spotify_data call: the source,
+    whether the cache was hit, and per stage its seconds, rows and
+    memory_delta_mb, plus total_seconds.
+    """
+    return _last_report
+
+def read_ndjson(json_file_path, chunksize=100_000):
+    """
+    Read newline-delimited JSON (as written by cat.py --stream) in chunks,
+    so the raw records never all sit in memory as Python objects at once.
+    """
+    reader = pd.read_json(json_file_path, lines=True, chunksize=chunksize,
+                          dtype=False, convert_dates=False)
+    with reader:
+        chunks = list(reader)
+    
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+def preprocess_data(df, report=None):
+    """
+    Clean and preprocess the Spotify data for analysis. Each step is
+    recorded as a stage in report when one is passed.
+    """
+    logger.info("Preprocessing data...")
+    report = report if report is not None else new_report()
+    
+    for name, step in [('to_datetime', convert_timestamps),
+                       ('time_columns', add_time_columns),
+                       ('media_info', add_media_columns),
+                       ('sessions', add_session_ids)]:
+        with stage(report, name, len(df)):
+            df = step(df)
     
+    logger.info("Preprocessing complete!")
+    logger.info(f"Date range: {df['date'].min()} to {df['date'].max()}")
+    logger.info(f"Total listening time: {df['minutes_played'].sum():.1f} minutes ({df['minutes_played'].sum()/60:.1f} hours)")
+    
+    return df
+
+def convert_timestamps(df):
+    df['ts'] = pd.to_datetime(df['ts'])
+    return df
+
+def add_time_columns(df):
+    """
+    Add calendar columns derived from ts and duration columns derived from ms_played.
+    """
     df['date'] = df['ts'].dt.date
     df['hour'] = df['ts'].dt.hour
     df['day_of_week'] = df['ts'].dt.day_name()
@@ -37,38 +251,13 @@ def preprocess_data(df):
     
     df['minutes_played'] = df['ms_played'] / (1000 * 60)
     df['seconds_played'] = df['ms_played'] / 1000
-    
-    def get_media_info(row):
-        if pd.notna(row['master_metadata_track_name']):
-            return {
-                'media_type': 'song',
-                'title': row['master_metadata_track_name'],
-                'artist': row['master_metadata_album_artist_name'] if pd.notna(row['master_metadata_album_artist_name']) else 'Unknown Artist',
-                'album': row['master_metadata_album_album_name'] if pd.notna(row['master_metadata_album_album_name']) else 'Unknown Album'
-            }
-        elif pd.notna(row['episode_name']):
-            return {
-                'media_type': 'podcast',
-                'title': row['episode_name'],
-                'artist': row['episode_show_name'] if pd.notna(row['episode_show_name']) else 'Unknown Podcast',
-                'album': 'Podcast Episode'
-            }
-        elif pd.notna(row['audiobook_title']):
-            return {
-                'media_type': 'audiobook',
-                'title': row['audiobook_chapter_title'] if pd.notna(row['audiobook_chapter_title']) else row['audiobook_title'],
-                'artist': row['audiobook_title'],
-                'album': 'Audiobook'
-            }
-        else:
-            return {
-                'media_type': 'unknown',
-                'title': 'Unknown Content',
-                'artist': 'Unknown',
-                'album': 'Unknown'
-            }
-    
-    media_info = df.apply(get_media_info, axis=1, result_type='expand')
+    return df
+
+def add_media_columns(df):
+    """
+    Add media type, title, artist and album columns plus skip/complete-play flags.
+    """
+    media_info = resolve_media_info(df)
     df['media_type'] = media_info['media_type']
     df['track_name'] = media_info['title']
     df['track_artist'] = media_info['artist']
@@ -76,31 +265,120 @@ def preprocess_data(df):
     
     df['is_skip'] = df['skipped'] == True
     df['is_complete_play'] = (df['reason_end'] == 'endplay') & (~df['is_skip'])
-    
+    return df
+
+def add_session_ids(df):
+    """
+    Number listening sessions, starting a new one after every gap of more than 30 minutes.
+    """
     df['listening_session'] = (df['ts'].diff() > pd.Timedelta(minutes=30)).cumsum()
+    return df
+
+def resolve_media_info(df):
+    """
+    Resolve media type, title, artist and album for every row at once.
+    Rows resolve as song, then podcast, then audiobook, then unknown,
+    using whole-column masks instead of a row-wise apply.
+    """
+    track_name = df['master_metadata_track_name']
+    episode_name = df['episode_name']
+    audiobook_title = df['audiobook_title']
+    
+    is_song = track_name.notna()
+    is_podcast = ~is_song & episode_name.notna()
+    is_audiobook = ~is_song & ~is_podcast & audiobook_title.notna()
+    conditions = [is_song.to_numpy(), is_podcast.to_numpy(), is_audiobook.to_numpy()]
+    
+    def pick(choices, default):
+        choices = [pd.Series(c, index=df.index).astype(object).to_numpy() for c in choices]
+        return pd.Series(np.select(conditions, choices, default=default), index=df.index, dtype=object)
+    
+    return pd.DataFrame({
+        'media_type': pick(['song', 'podcast', 'audiobook'], 'unknown'),
+        'title': pick([
+            track_name,
+            episode_name,
+            df['audiobook_chapter_title'].fillna(audiobook_title)
+        ], 'Unknown Content'),
+        'artist': pick([
+            df['master_metadata_album_artist_name'].fillna('Unknown Artist'),
+            df['episode_show_name'].fillna('Unknown Podcast'),
+            audiobook_title
+        ], 'Unknown'),
+        'album': pick([
+            df['master_metadata_album_album_name'].fillna('Unknown Album'),
+            'Podcast Episode',
+            'Audiobook'
+        ], 'Unknown')
+    }, index=df.index)
+
+def compact_frame(df):
+    """
+    Return a smaller version of a preprocessed frame: weekday and month
+    become ordered categoricals, repeated strings become categoricals,
+    integers are downcast, date is stored as datetime64 and the float
+    columns derived from ms_played are dropped.
+    """
+    df = df.drop(columns=[col for col in DERIVED_COLUMNS if col in df.columns])
+    
+    ts = df['ts'].dt.tz_localize(None) if df['ts'].dt.tz is not None else df['ts']
+    df['date'] = ts.dt.normalize()
+    df['day_of_week'] = pd.Categorical(df['day_of_week'], categories=DAY_ORDER, ordered=True)
+    df['month'] = pd.Categorical(df['month'], categories=MONTH_ORDER, ordered=True)
     
-    print("Preprocessing complete!")
-    print(f"Date range: {df['date'].min()} to {df['date'].max()}")
-    print(f"Total listening time: {df['minutes_played'].sum():.1f} minutes ({df['minutes_played'].sum()/60:.1f} hours)")
+    for col in ['ms_played', 'hour', 'year', 'listening_session']:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    
+    for col in df.columns:
+        series = df[col]
+        if not (series.dtype == object or isinstance(series.dtype, pd.StringDtype)):
+            continue
+        if pd.api.types.infer_dtype(series, skipna=True) == 'boolean':
+            df[col] = series.astype('boolean')
+            continue
+        try:
+            repeated = series.nunique() <= len(series) // 2
+        except TypeError:
+            continue
+        if repeated:
+            df[col] = series.astype('category')
     
     return df
 
+def add_derived_columns(df, columns=('minutes_played',)):
+    """
+    Add derived float32 columns (minutes_played, seconds_played) that are
+    not already present.
+    """
+    for col in columns:
+        if col not in df.columns:
+            df[col] = (df['ms_played'] / DERIVED_COLUMNS[col]).astype('float32')
+    return df
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
 def get_data_summary(df):
     """
     Generate a summary of the dataset.
     """
-    media_type_counts = df['media_type'].value_counts()
-    media_type_percentages = (df['media_type'].value_counts(normalize=True) * 100).round(1)
+    totals = aggregate(df, (), ('minutes', 'skip_rate', 'unique_tracks', 'unique_artists', 'unique_albums')).iloc[0]
+    daily_minutes = aggregate(df, 'date', ('minutes',))['minutes']
+    media_type_counts = aggregate(df, 'media_type', ('plays',))['plays'].sort_values(ascending=False)
+    media_type_percentages = (media_type_counts / media_type_counts.sum() * 100).round(1)
+    recent_cutoff = pd.to_datetime('2023-12-18')
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        recent_cutoff = recent_cutoff.date()
     
     summary = {
         'total_tracks': len(df),
-        'unique_tracks': df['spotify_track_uri'].nunique(),
-        'unique_artists': df['track_artist'].nunique(),
-        'unique_albums': df['album_name'].nunique(),
-        'date_range': f"{df['date'].min()} to {df['date'].max()}",
-        'total_listening_hours': round(df['minutes_played'].sum() / 60, 1),
-        'avg_daily_hours': round(df[df['date'] >= pd.to_datetime('2023-12-18').date()].groupby('date')['minutes_played'].sum().mean() / 60, 2),
-        'skip_rate': round(df['is_skip'].mean() * 100, 1),
+        'unique_tracks': int(totals['unique_tracks']),
+        'unique_artists': int(totals['unique_artists']),
+        'unique_albums': int(totals['unique_albums']),
+        'date_range': f"{pd.Timestamp(daily_minutes.index.min()).date()} to {pd.Timestamp(daily_minutes.index.max()).date()}",
+        'total_listening_hours': round(totals['minutes'] / 60, 1),
+        'avg_daily_hours': round(daily_minutes[daily_minutes.index >= recent_cutoff].mean() / 60, 2),
+        'skip_rate': round(totals['skip_rate'], 1),
         'media_breakdown': {media_type: f"{count} ({media_type_percentages[media_type]}%)" 
                           for media_type, count in media_type_counts.items()}
     }
@@ -0,0 +1,192 @@
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from cache import CACHE_DIR_NAME, fingerprint
+from cat import find_input_files, iter_json_records
+from cube import add_to_cube, build_cube, load_cube, save_cube
+from data_loader import PREPROCESS_VERSION, preprocess_data
+
+DEDUP_KEY = ['ts', 'spotify_track_uri', 'ms_played']
+SESSION_GAP = pd.Timedelta(minutes=30)
+SEGMENT_ROWS = 500_000
+
+def store_dir_for(directory):
+    return Path(directory) / CACHE_DIR_NAME / 'history'
+
+def load_manifest(store_dir):
+    """
+    Read the store manifest, or return an empty one for a fresh store.
+    """
+    manifest_path = Path(store_dir) / 'manifest.json'
+    if manifest_path.exists():
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    return {'version': PREPROCESS_VERSION, 'files': {}, 'segments': [], 'next_segment': 0}
+
+def save_manifest(store_dir, manifest):
+    manifest_path = Path(store_dir) / 'manifest.json'
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def load_history(directory=None):
+    """
+    Load the ingested listening history as one preprocessed DataFrame.
+    """
+    store_dir = store_dir_for(directory or Path(__file__).parent)
+    manifest = load_manifest(store_dir)
+    frames = [pd.read_feather(store_dir / seg['file']) for seg in manifest['segments']]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def load_history_cube(directory=None):
+    """
+    Load the rollup cube kept in step with the ingested history.
+    """
+    return load_cube(store_dir_for(directory or Path(__file__).parent) / 'cube')
+
+def assign_sessions(ts, base_session=0, prev_ts=None):
+    """
+    Number listening sessions the way preprocess_data does (a new session
+    after every gap of more than 30 minutes), continuing from the session
+    and timestamp of the row just before this slice.
+    """
+    gaps = ts.diff() > SESSION_GAP
+    if prev_ts is not None and len(ts):
+        gaps.iloc[0] = ts.iloc[0] - prev_ts > SESSION_GAP
+    return base_session + gaps.cumsum()
+
+def _changed_files(directory, manifest):
+    """
+    Return (path, fingerprint) for every export file not yet ingested as-is.
+    """
+    changed = []
+    for path in find_input_files(directory):
+        known = manifest['files'].get(path.name)
+        current = fingerprint(path, with_hash=False)
+        if known and known['size'] == current['size'] and known['mtime_ns'] == current['mtime_ns']:
+            continue
+        current = fingerprint(path)
+        if known and known['hash'] == current['hash']:
+            known['mtime_ns'] = current['mtime_ns']
+            continue
+        changed.append((path, current))
+    return changed
+
+def _write_segments(store_dir, manifest, df):
+    """
+    Split a session-numbered, time-sorted frame into segment files and
+    append their descriptions to the manifest.
+    """
+    for start in range(0, len(df), SEGMENT_ROWS):
+        part = df.iloc[start:start + SEGMENT_ROWS].reset_index(drop=True)
+        name = f"segment-{manifest['next_segment']:05d}.feather"
+        manifest['next_segment'] += 1
+        part.to_feather(store_dir / name)
+        manifest['segments'].append({
+            'file': name,
+            'rows': len(part),
+            'min_ts': part['ts'].iloc[0].isoformat(),
+            'max_ts': part['ts'].iloc[-1].isoformat(),
+            'last_session': int(part['listening_session'].iloc[-1])
+        })
+
+def ingest_new_files(directory=None, rebuild=False):
+    """
+    Ingest export files that are new or changed since the last run into the
+    on-disk history store, without reprocessing what is already there.
+    
+    Only the new records are parsed and preprocessed. They are deduplicated
+    on (ts, spotify_track_uri, ms_played) and merged into the stored
+    segments. New data after the end of the history becomes new segments.
+    Data reaching back into the history rewrites only the segments from
+    that point on. Session ids are renumbered from the last untouched
+    segment, so they match numbering the whole sorted history at once.
+    
+    Returns the number of rows added.
+    """
+    directory = Path(directory or Path(__file__).parent)
+    store_dir = store_dir_for(directory)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    
+    manifest = load_manifest(store_dir)
+    if rebuild or manifest['version'] != PREPROCESS_VERSION:
+        for seg in manifest['segments']:
+            (store_dir / seg['file']).unlink(missing_ok=True)
+        for table in (store_dir / 'cube').glob('*.feather'):
+            table.unlink()
+        manifest = {'version': PREPROCESS_VERSION, 'files': {}, 'segments': [], 'next_segment': 0}
+    
+    changed = _changed_files(directory, manifest)
+    if not changed:
+        save_manifest(store_dir, manifest)
+        print("No new export files to ingest")
+        return 0
+    
+    records = []
+    for path, _ in changed:
+        print(f"Reading: {path.name}")
+        records.extend(iter_json_records(path))
+    
+    if not records:
+        for path, fp in changed:
+            manifest['files'][path.name] = fp
+        save_manifest(store_dir, manifest)
+        print("No new listening records found")
+        return 0
+    
+    new = preprocess_data(pd.DataFrame(records))
+    new = new.sort_values('ts', kind='stable').drop_duplicates(DEDUP_KEY)
+    
+    # Segments are time-ordered; everything from the first one that could
+    # overlap the new data gets merged and rewritten, the rest is untouched.
+    segments = manifest['segments']
+    first_new_ts = new['ts'].iloc[0] if len(new) else None
+    keep = len(segments)
+    while first_new_ts is not None and keep > 0 and pd.Timestamp(segments[keep - 1]['max_ts']) >= first_new_ts:
+        keep -= 1
+    
+    rewritten = segments[keep:]
+    old_tail = [pd.read_feather(store_dir / seg['file']) for seg in rewritten]
+    
+    # Old rows come first, so drop_duplicates keeps them and _is_new marks
+    # exactly the rows this run adds.
+    new['_is_new'] = True
+    old_tail = [seg.assign(_is_new=False) for seg in old_tail]
+    merged = pd.concat(old_tail + [new], ignore_index=True) if old_tail else new
+    merged = merged.sort_values('ts', kind='stable').drop_duplicates(DEDUP_KEY)
+    added_rows = merged[merged['_is_new']].drop(columns='_is_new')
+    merged = merged.drop(columns='_is_new')
+    
+    if keep > 0:
+        prev = segments[keep - 1]
+        merged['listening_session'] = assign_sessions(
+            merged['ts'], prev['last_session'], pd.Timestamp(prev['max_ts']))
+    else:
+        merged['listening_session'] = assign_sessions(merged['ts'])
+    
+    manifest['segments'] = segments[:keep]
+    _write_segments(store_dir, manifest, merged)
+    for path, fp in changed:
+        manifest['files'][path.name] = fp
+    save_manifest(store_dir, manifest)
+    
+    for seg in rewritten:
+        (store_dir / seg['file']).unlink(missing_ok=True)
+    
+    cube = load_cube(store_dir / 'cube')
+    cube = build_cube(load_history(directory)) if cube is None else add_to_cube(cube, added_rows)
+    save_cube(cube, store_dir / 'cube')
+    
+    added = len(added_rows)
+    print(f"Ingested {added:,} new listening records from {len(changed)} files "
+          f"({len(rewritten)} existing segments rewritten)")
+    return added
+
+if __name__ == "__main__":
+    ingest_new_files()
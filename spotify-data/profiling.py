@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('spotify_data')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def set_verbosity(quiet=False, verbose=False):
+    """
+    quiet shows only warnings, the default shows progress messages, and
+    verbose adds a line per timed stage.
+    """
+    if quiet:
+        logger.setLevel(logging.WARNING)
+    elif verbose:
+        logger.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(logging.INFO)
+
+def _rss_bytes():
+    """
+    Current resident set size, or the peak where the current one is not
+    available (resource reports kilobytes on Linux and bytes on macOS).
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def _peak_rss_bytes():
+    """
+    Highest resident set size since the process started, or since the last
+    _reset_peak_rss.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _reset_peak_rss():
+    """
+    Restart the peak resident set size from the current one (Linux only).
+    Returns False where that is not possible, in which case the peak still
+    covers everything the process did before.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def new_report(source=None):
+    return {'source': str(source) if source is not None else None, 'cache': None, 'stages': []}
+
+@contextmanager
+def stage(report, name, rows=None):
+    """
+    Time a named stage and record its duration, rows processed and change
+    in resident memory. Set info['rows'] inside the block when the row
+    count is only known afterwards.
+    """
+    info = {'stage': name, 'rows': rows}
+    start_rss = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        info['seconds'] = round(time.perf_counter() - start, 4)
+        info['memory_delta_mb'] = round((_rss_bytes() - start_rss) / 1e6, 1)
+        report['stages'].append(info)
+        rows_text = f", {info['rows']:,} rows" if info['rows'] is not None else ''
+        logger.debug(f"  {name}: {info['seconds']:.3f}s{rows_text}, {info['memory_delta_mb']:+.1f} MB")
+
+def finish_report(report):
+    report['total_seconds'] = round(sum(s['seconds'] for s in report['stages']), 4)
+    return report
+
+def dump_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,197 @@
+import argparse
+import json
+import string
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Field order of a real Streaming_History_Audio_*.json record.
+FIELDS = [
+    'ts', 'platform', 'ms_played', 'conn_country', 'ip_addr',
+    'master_metadata_track_name', 'master_metadata_album_artist_name',
+    'master_metadata_album_album_name', 'spotify_track_uri',
+    'episode_name', 'episode_show_name', 'spotify_episode_uri',
+    'audiobook_title', 'audiobook_uri', 'audiobook_chapter_uri', 'audiobook_chapter_title',
+    'reason_start', 'reason_end', 'shuffle', 'skipped', 'offline',
+    'offline_timestamp', 'incognito_mode'
+]
+
+PLATFORMS = ['ios', 'android', 'windows', 'osx', 'web_player', 'not_applicable']
+PLATFORM_WEIGHTS = [0.45, 0.2, 0.15, 0.12, 0.07, 0.01]
+COUNTRIES = ['CA', 'US', 'GB', 'JP', 'FR']
+COUNTRY_WEIGHTS = [0.8, 0.15, 0.02, 0.02, 0.01]
+REASONS_START = ['trackdone', 'clickrow', 'fwdbtn', 'backbtn', 'playbtn', 'appload', 'remote', 'trackerror']
+REASONS_START_WEIGHTS = [0.55, 0.15, 0.15, 0.04, 0.05, 0.03, 0.02, 0.01]
+REASONS_END_DONE = ['trackdone', 'endplay', 'logout', 'remote']
+REASONS_END_DONE_WEIGHTS = [0.85, 0.1, 0.03, 0.02]
+REASONS_END_SKIP = ['fwdbtn', 'backbtn', 'endplay', 'unexpected-exit', 'trackerror']
+REASONS_END_SKIP_WEIGHTS = [0.8, 0.1, 0.05, 0.04, 0.01]
+
+# song / podcast / audiobook / unknown (every media field null)
+MEDIA_WEIGHTS = [0.85, 0.1, 0.02, 0.03]
+SESSION_BREAK = 0.08
+TRACKS_PER_ARTIST = 25
+ROWS_PER_LISTENER = 150_000
+
+def build_catalog(rows, rng):
+    """
+    Artists with Zipf-distributed popularity, each with a few albums and
+    tracks, plus podcast shows and audiobooks. Cardinality grows with the
+    number of rows so the 10M-row history is not just the 100k one repeated.
+    """
+    n_artists = max(200, rows // 150)
+    weights = 1.0 / np.arange(1, n_artists + 1) ** 1.1
+    return {
+        'n_artists': n_artists,
+        'artist_weights': weights / weights.sum(),
+        'n_shows': max(20, rows // 20_000),
+        'n_books': max(5, rows // 100_000),
+        'track_lengths': rng.integers(90_000, 360_000, n_artists * TRACKS_PER_ARTIST)
+    }
+
+def track_fields(artist, number):
+    track_id = artist * TRACKS_PER_ARTIST + number
+    return {
+        'master_metadata_track_name': _word(track_id * 7 + 3, 'Track'),
+        'master_metadata_album_artist_name': _word(artist, 'Artist'),
+        'master_metadata_album_album_name': _word(artist * 5 + number // 8, 'Album'),
+        'spotify_track_uri': f"spotify:track:{_uri(track_id)}"
+    }
+
+def _word(n, prefix):
+    letters = string.ascii_lowercase
+    word = ''
+    n += 1
+    while n:
+        n, r = divmod(n - 1, 26)
+        word = letters[r] + word
+    return f"{prefix} {word.capitalize()}"
+
+def _uri(n):
+    alphabet = string.ascii_letters + string.digits
+    out = []
+    n = n * 2654435761 % (62 ** 22)
+    for _ in range(22):
+        n, r = divmod(n, 62)
+        out.append(alphabet[r])
+    return ''.join(out)
+
+def generate_records(rows, seed=0, start=datetime(2016, 1, 1, tzinfo=timezone.utc), chunk_size=100_000):
+    """
+    Yield realistic streaming-history records in chunks of chunk_size, so
+    memory does not grow with rows.
+
+    Large histories are split across several listeners of ROWS_PER_LISTENER
+    plays each (about a decade of daily listening), one after another, like
+    a family's exports concatenated by cat.py. Each listener's records are
+    in timestamp order.
+    """
+    rng = np.random.default_rng(seed)
+    catalog = build_catalog(rows, rng)
+    
+    for listener_start in range(0, rows, ROWS_PER_LISTENER):
+        listener_rows = min(ROWS_PER_LISTENER, rows - listener_start)
+        clock = start.timestamp() + rng.integers(0, 30 * 86400)
+        for offset in range(0, listener_rows, chunk_size):
+            n = min(chunk_size, listener_rows - offset)
+            records, clock = _generate_chunk(n, rng, catalog, clock)
+            yield from records
+
+def _generate_chunk(n, rng, catalog, clock):
+    """
+    Return n consecutive records starting after clock, and the new clock.
+    """
+    media = rng.choice(4, n, p=MEDIA_WEIGHTS)
+    artists = rng.choice(catalog['n_artists'], n, p=catalog['artist_weights'])
+    numbers = np.minimum(rng.zipf(1.6, n) - 1, TRACKS_PER_ARTIST - 1)
+    lengths = catalog['track_lengths'][artists * TRACKS_PER_ARTIST + numbers]
+    lengths = np.where(media == 1, rng.integers(600_000, 5_400_000, n), lengths)
+    lengths = np.where(media == 2, rng.integers(300_000, 2_400_000, n), lengths)
+    
+    skipped = rng.random(n) < 0.25
+    ms_played = np.where(skipped, rng.integers(0, 30_000, n), lengths)
+    skipped_known = rng.random(n) > 0.15
+    
+    # Plays follow each other back to back, with an occasional long break.
+    breaks = rng.random(n) < SESSION_BREAK
+    gaps = np.where(breaks, rng.exponential(6 * 3600, n) + 1800, ms_played / 1000 + rng.integers(0, 5, n))
+    times = clock + np.cumsum(gaps)
+    
+    platforms = rng.choice(PLATFORMS, n, p=PLATFORM_WEIGHTS)
+    countries = rng.choice(COUNTRIES, n, p=COUNTRY_WEIGHTS)
+    reason_start = rng.choice(REASONS_START, n, p=REASONS_START_WEIGHTS)
+    reason_end_done = rng.choice(REASONS_END_DONE, n, p=REASONS_END_DONE_WEIGHTS)
+    reason_end_skip = rng.choice(REASONS_END_SKIP, n, p=REASONS_END_SKIP_WEIGHTS)
+    shuffle = rng.random(n) < 0.4
+    offline = rng.random(n) < 0.05
+    shows = rng.integers(0, catalog['n_shows'], n)
+    books = rng.integers(0, catalog['n_books'], n)
+    chapters = rng.integers(1, 40, n)
+    ips = rng.integers(0, 50, n)
+    
+    records = []
+    for i in range(n):
+        record = dict.fromkeys(FIELDS)
+        record['ts'] = datetime.fromtimestamp(int(times[i]), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        record['platform'] = str(platforms[i])
+        record['ms_played'] = int(ms_played[i])
+        record['conn_country'] = str(countries[i])
+        record['ip_addr'] = f"10.0.{ips[i]}.{ips[i] * 3 % 255}"
+        if media[i] == 0:
+            record.update(track_fields(int(artists[i]), int(numbers[i])))
+            # A small share of tracks lose their album or artist metadata.
+            if rng.random() < 0.005:
+                record['master_metadata_album_album_name'] = None
+            if rng.random() < 0.002:
+                record['master_metadata_album_artist_name'] = None
+        elif media[i] == 1:
+            record['episode_name'] = f"{_word(int(shows[i]), 'Show')} #{int(times[i]) % 500}"
+            record['episode_show_name'] = _word(int(shows[i]), 'Show') if rng.random() > 0.01 else None
+            record['spotify_episode_uri'] = f"spotify:episode:{_uri(int(shows[i]) * 1000 + int(times[i]) % 500)}"
+        elif media[i] == 2:
+            title = _word(int(books[i]), 'Book')
+            record['audiobook_title'] = title
+            record['audiobook_uri'] = f"spotify:show:{_uri(int(books[i]))}"
+            if rng.random() > 0.1:
+                record['audiobook_chapter_title'] = f"Chapter {chapters[i]}"
+                record['audiobook_chapter_uri'] = f"spotify:episode:{_uri(int(books[i]) * 100 + int(chapters[i]))}"
+        record['reason_start'] = str(reason_start[i])
+        record['reason_end'] = str(reason_end_skip[i] if skipped[i] else reason_end_done[i])
+        record['shuffle'] = bool(shuffle[i])
+        record['skipped'] = bool(skipped[i]) if skipped_known[i] else None
+        record['offline'] = bool(offline[i])
+        record['offline_timestamp'] = int(times[i]) * 1000 if offline[i] else None
+        record['incognito_mode'] = False
+        records.append(record)
+    
+    return records, float(times[-1])
+
+def write_history(path, rows, seed=0):
+    """
+    Write a synthetic history to path without holding it in memory. Paths
+    ending in .ndjson or .jsonl get one record per line, anything else a
+    JSON array like a real export file.
+    """
+    lines = str(path).endswith(('.ndjson', '.jsonl'))
+    with open(path, 'w', encoding='utf-8') as f:
+        if not lines:
+            f.write('[')
+        for i, record in enumerate(generate_records(rows, seed)):
+            if lines:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+            else:
+                f.write(',\n' if i else '\n')
+                f.write(json.dumps(record, ensure_ascii=False))
+        if not lines:
+            f.write('\n]\n')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Spotify streaming history.")
+    parser.add_argument("rows", type=int, help="number of records, e.g. 100000, 1000000 or 10000000")
+    parser.add_argument("--out", default="synthetic_history.json", help="output file (.json, .ndjson or .jsonl)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    write_history(args.out, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} records to {args.out}")
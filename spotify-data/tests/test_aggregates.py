@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+import aggregates
+from aggregates import aggregate
+
+PANDAS_3 = int(pd.__version__.split('.')[0]) >= 3
+
+@pytest.fixture(params=['default', 'checksum', 'copy_on_write'])
+def df(request, monkeypatch):
+    # checksum: how pandas 2 is handled without copy-on-write, on any
+    # version; copy_on_write: pandas 2 with the option turned on
+    if request.param == 'checksum':
+        monkeypatch.setattr(aggregates, '_copy_on_write', lambda: False)
+    if request.param == 'copy_on_write':
+        if PANDAS_3:
+            pytest.skip('copy-on-write is always on in pandas 3')
+        monkeypatch.setattr(pd.options.mode, 'copy_on_write', True)
+    aggregates.clear_cache()
+    return pd.DataFrame({
+        'ts': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04'], utc=True),
+        'ms_played': [60_000, 120_000, 30_000, 90_000],
+        'minutes_played': [1.0, 2.0, 0.5, 1.5],
+        'is_skip': [False, False, True, False],
+        'track_artist': ['a', 'b', 'a', 'c'],
+        'date': ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04']
+    })
+
+def cached(df, grouping):
+    return aggregates._memo[id(df)]['results'][grouping][1]
+
+def test_memoized(df):
+    assert aggregate(df, 'track_artist')['minutes'].to_dict() == {'a': 1.5, 'b': 2.0, 'c': 1.5}
+    first = cached(df, 'track_artist')
+    aggregate(df, 'track_artist')
+    assert cached(df, 'track_artist') is first
+
+def test_replaced_grouping_column(df):
+    aggregate(df, 'track_artist')
+    df['track_artist'] = df['track_artist'].str.upper()
+    assert list(aggregate(df, 'track_artist').index) == ['A', 'B', 'C']
+
+def test_edited_grouping_column(df):
+    aggregate(df, 'track_artist')
+    df.loc[3, 'track_artist'] = 'a'
+    assert aggregate(df, 'track_artist')['plays'].to_dict() == {'a': 3, 'b': 1}
+
+def test_edited_metric_column(df):
+    assert aggregate(df, (), ('minutes', 'skips')).iloc[0].tolist() == [5.0, 1]
+    df.loc[0, 'minutes_played'] = 10.0
+    df['is_skip'] = True
+    assert aggregate(df, (), ('minutes', 'skips')).iloc[0].tolist() == [14.0, 4]
+
+def test_unrelated_column_keeps_cache(df):
+    aggregate(df, 'track_artist')
+    first = cached(df, 'track_artist')
+    df['week_number'] = 1
+    df.loc[0, 'date'] = '2023-12-31'
+    aggregate(df, 'track_artist')
+    assert cached(df, 'track_artist') is first
+
+def test_added_metric_after_edit(df):
+    aggregate(df, 'track_artist', ('minutes',))
+    df.loc[1, 'minutes_played'] = 4.0
+    result = aggregate(df, 'track_artist', ('minutes', 'skips'))
+    assert result.loc['b'].tolist() == [4.0, 0]
+
+def test_entry_dropped_with_frame(df):
+    copy = df.copy()
+    aggregate(copy, 'track_artist')
+    key = id(copy)
+    del copy
+    assert key not in aggregates._memo
+
+def test_swapped_values(df):
+    assert aggregate(df, 'track_artist')['minutes'].to_dict() == {'a': 1.5, 'b': 2.0, 'c': 1.5}
+    df.loc[0, 'track_artist'], df.loc[1, 'track_artist'] = 'b', 'a'
+    assert aggregate(df, 'track_artist')['minutes'].to_dict() == {'a': 2.5, 'b': 1.0, 'c': 1.5}
+
+def test_edit_through_iloc(df):
+    aggregate(df, (), ('skips',))
+    df.iloc[0, df.columns.get_loc('is_skip')] = True
+    assert aggregate(df, (), ('skips',)).iloc[0, 0] == 2
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from cat import iter_json_records, stream_combine_json_files
+
+RECORDS = [
+    {'ts': '2024-01-01T00:00:00Z', 'master_metadata_track_name': 'Commas, brackets ] and [ braces }', 'ms_played': 1234567},
+    {'master_metadata_track_name': 'Quotes "inside" and \\ backslashes', 'ms_played': 0},
+    {'master_metadata_track_name': 'Björk — Jóga 日本語 🎵', 'episode_name': None, 'offline': False},
+    {'ms_played': 98765432101234, 'offline_timestamp': 1.5e-7, 'negative': -42.125},
+    'a bare string, with ] and ,',
+    12345678901234567890,
+    [1, [2, [3, ']']]],
+    {},
+    []
+]
+
+def write(tmp_path, text):
+    path = tmp_path / 'export.json'
+    path.write_text(text, encoding='utf-8')
+    return path
+
+def read(path, chunk_size):
+    return list(iter_json_records(path, chunk_size=chunk_size))
+
+@pytest.mark.parametrize('chunk_size', list(range(1, 65)))
+def test_small_chunks(tmp_path, chunk_size):
+    compact = write(tmp_path, json.dumps(RECORDS, ensure_ascii=False, separators=(',', ':')))
+    assert read(compact, chunk_size) == RECORDS
+    pretty = write(tmp_path, '\n  ' + json.dumps(RECORDS, ensure_ascii=False, indent=2) + '\n\n')
+    assert read(pretty, chunk_size) == RECORDS
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 8, 9])
+def test_numbers_cut_at_buffer_boundary(tmp_path, chunk_size):
+    # every number ends at a different offset, so some end exactly at a chunk edge
+    numbers = [int('9' * n) for n in range(1, 25)] + [float('1.' + '5' * n) for n in range(1, 12)] + [-1e-12, 2.5e+30]
+    path = write(tmp_path, json.dumps(numbers))
+    assert read(path, chunk_size) == numbers
+    path = write(tmp_path, json.dumps(numbers, separators=(',', ':')))
+    assert read(path, chunk_size) == numbers
+    path = write(tmp_path, '[123456789]')
+    assert read(path, chunk_size) == [123456789]
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 64])
+@pytest.mark.parametrize('text', ['', ' ', '\n\n\t  \n', ' ' * 200])
+def test_empty_files(tmp_path, chunk_size, text):
+    assert read(write(tmp_path, text), chunk_size) == []
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 64])
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[\n]\n'])
+def test_empty_array(tmp_path, chunk_size, text):
+    assert read(write(tmp_path, text), chunk_size) == []
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64])
+@pytest.mark.parametrize('value', [{'ts': '2024', 'name': 'a, ] "b"'}, 'just a string', 42, None])
+def test_non_array_top_level(tmp_path, chunk_size, value):
+    path = write(tmp_path, '   ' + json.dumps(value) + '\n')
+    assert read(path, chunk_size) == [value]
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 64])
+@pytest.mark.parametrize('text', ['[{"a": 1},', '[{"a": 1}', '[{"a": ', '[{"a": 1}, {"b"]', '{"a": 1'])
+def test_truncated_files_raise(tmp_path, chunk_size, text):
+    with pytest.raises(json.JSONDecodeError):
+        read(write(tmp_path, text), chunk_size)
+
+def test_stream_combine(tmp_path):
+    (tmp_path / 'a.json').write_text(json.dumps(RECORDS[:3], ensure_ascii=False), encoding='utf-8')
+    (tmp_path / 'b.json').write_text(json.dumps(RECORDS[3:]), encoding='utf-8')
+    (tmp_path / 'c.json').write_text('[{"broken": ', encoding='utf-8')
+    stream_combine_json_files(tmp_path)
+    lines = (tmp_path / 'combined_data.ndjson').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == RECORDS
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+import cube
+from cache import cache_paths
+from data_loader import load_spotify_data
+from synthetic import write_history
+
+@pytest.fixture(scope='module')
+def history(tmp_path_factory):
+    path = tmp_path_factory.mktemp('export') / 'history.json'
+    write_history(path, 20_000, seed=3)
+    return path
+
+def assert_same_cube(got, expected):
+    assert set(got) == set(expected)
+    for name in expected:
+        keys = cube.ROLLUPS[name]
+        a = got[name].sort_values(keys).reset_index(drop=True)
+        b = expected[name].sort_values(keys).reset_index(drop=True)
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_categorical=False)
+
+def test_reuses_cache_for_same_frame(history):
+    df = load_spotify_data(history, quiet=True)
+    built = cube.cube_for(df, history)
+    assert cache_paths(history, 'cube-artist')[0].exists()
+    
+    cached = cube.cube_for(load_spotify_data(history, quiet=True), history)
+    assert_same_cube(cached, built)
+    assert cube.summary(cached)['records'] == len(df)
+
+def test_filtered_frame_gets_its_own_cube(history):
+    full = load_spotify_data(history, quiet=True)
+    cube.cube_for(full, history)
+    
+    year = int(full['ts'].dt.year.mode()[0])
+    filtered = load_spotify_data(history, quiet=True, years=year)
+    assert 0 < len(filtered) < len(full)
+    assert_same_cube(cube.cube_for(filtered, history), cube.build_cube(filtered))
+    
+    # and the full export is not answered from the filtered cube
+    assert cube.summary(cube.cube_for(full, history))['records'] == len(full)
+
+def test_missing_source_builds_without_cache(history, tmp_path):
+    df = load_spotify_data(history, quiet=True)
+    missing = tmp_path / 'gone.json'
+    assert_same_cube(cube.cube_for(df, missing), cube.build_cube(df))
+    assert not cache_paths(missing, 'cube-artist')[0].parent.exists()
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import cube
+import ingest
+from data_loader import preprocess_data
+from synthetic import generate_records
+
+ROWS = 30_000
+
+@pytest.fixture(scope='module')
+def records():
+    return sorted(generate_records(ROWS, seed=5), key=lambda record: record['ts'])
+
+def write(directory, name, records):
+    with open(directory / name, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+
+def full_run(records):
+    """
+    The reference: the whole deduplicated history preprocessed at once.
+    """
+    df = pd.DataFrame(records).drop_duplicates(ingest.DEDUP_KEY)
+    return preprocess_data(df.reset_index(drop=True))
+
+def rows(df):
+    return sorted(zip(df['ts'], df['spotify_track_uri'].fillna(''), df['ms_played'], df['listening_session']))
+
+def totals(rollups):
+    return {name: rollups[name][cube.MEASURES].sum().to_dict() for name in cube.ROLLUPS}
+
+def test_overlapping_files_match_one_full_run(records, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, 'SEGMENT_ROWS', 4000)
+    
+    # Arrive out of order and overlapping, the middle first
+    middle, early, late = records[12_000:20_000], records[:14_000], records[18_000:]
+    write(tmp_path, 'StreamingHistory1.json', middle)
+    assert ingest.ingest_new_files(tmp_path) == len(middle)
+    
+    write(tmp_path, 'StreamingHistory0.json', early)
+    assert ingest.ingest_new_files(tmp_path) == 12_000
+    
+    # One more file that also repeats rows from the first two
+    write(tmp_path, 'StreamingHistory2.json', late + records[5_000:5_100])
+    assert ingest.ingest_new_files(tmp_path) == ROWS - 20_000
+    
+    expected = full_run(records)
+    history = ingest.load_history(tmp_path)
+    assert len(history) == len(expected)
+    assert history['ts'].is_monotonic_increasing
+    assert rows(history) == rows(expected)
+    assert history['listening_session'].iloc[-1] == expected['listening_session'].iloc[-1]
+    
+    stored = ingest.load_history_cube(tmp_path)
+    assert totals(stored) == totals(cube.build_cube(expected))
+    assert cube.summary(stored) == cube.summary(cube.build_cube(expected))
+    
+    manifest = ingest.load_manifest(ingest.store_dir_for(tmp_path))
+    assert sum(seg['rows'] for seg in manifest['segments']) == len(expected)
+    assert all(seg['rows'] <= 4000 for seg in manifest['segments'])
+
+def test_only_overlapping_segments_are_rewritten(records, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, 'SEGMENT_ROWS', 4000)
+    write(tmp_path, 'a.json', records[:20_000])
+    ingest.ingest_new_files(tmp_path)
+    store_dir = ingest.store_dir_for(tmp_path)
+    before = {seg['file'] for seg in ingest.load_manifest(store_dir)['segments']}
+    
+    write(tmp_path, 'b.json', records[19_000:])
+    ingest.ingest_new_files(tmp_path)
+    after = {seg['file'] for seg in ingest.load_manifest(store_dir)['segments']}
+    # segments 0-3 end before row 19,000; only the last one is merged
+    assert before - after == {'segment-00004.feather'}
+    assert rows(ingest.load_history(tmp_path)) == rows(full_run(records))
+
+def test_rerun_without_new_files(records, tmp_path):
+    write(tmp_path, 'a.json', records[:2_000])
+    assert ingest.ingest_new_files(tmp_path) == 2_000
+    assert ingest.ingest_new_files(tmp_path) == 0
+    
+    # touched but unchanged files are not ingested again either
+    os.utime(tmp_path / 'a.json', ns=(0, 10**18))
+    assert ingest.ingest_new_files(tmp_path) == 0
+    assert len(ingest.load_history(tmp_path)) == 2_000
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from benchmark import media_info_rowwise
+from data_loader import resolve_media_info
+from synthetic import FIELDS, generate_records
+
+COLUMNS = ['media_type', 'title', 'artist', 'album']
+
+def record(**fields):
+    row = dict.fromkeys(FIELDS)
+    row.update(ts='2024-01-01T00:00:00Z', ms_played=1000, **fields)
+    return row
+
+EDGE_CASES = [
+    record(master_metadata_track_name='Song', master_metadata_album_artist_name='Artist',
+           master_metadata_album_album_name='Album'),
+    record(master_metadata_track_name='No artist', master_metadata_album_album_name='Album'),
+    record(master_metadata_track_name='No album', master_metadata_album_artist_name='Artist'),
+    record(master_metadata_track_name='Bare song'),
+    record(episode_name='Episode', episode_show_name='Show'),
+    record(episode_name='Episode without show'),
+    record(audiobook_title='Book', audiobook_chapter_title='Chapter 3'),
+    record(audiobook_title='Book without chapters'),
+    record(),
+    # Earlier fields win when several are set
+    record(master_metadata_track_name='Song', episode_name='Episode', audiobook_title='Book'),
+    record(episode_name='Episode', audiobook_title='Book'),
+]
+
+def assert_same(df):
+    expected = media_info_rowwise(df)
+    resolved = resolve_media_info(df)
+    for column in COLUMNS:
+        assert resolved[column].tolist() == expected[column].tolist(), column
+
+def test_edge_cases():
+    assert_same(pd.DataFrame(EDGE_CASES))
+
+def test_edge_case_values():
+    resolved = resolve_media_info(pd.DataFrame(EDGE_CASES))
+    assert resolved.loc[1, 'artist'] == 'Unknown Artist'
+    assert resolved.loc[2, 'album'] == 'Unknown Album'
+    assert resolved.loc[5, 'artist'] == 'Unknown Podcast'
+    assert resolved.loc[7, 'title'] == 'Book without chapters'
+    assert resolved.loc[8].tolist() == ['unknown', 'Unknown Content', 'Unknown', 'Unknown']
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_synthetic_history(seed):
+    df = pd.DataFrame(list(generate_records(20_000, seed)))
+    # The generator drops some artists, albums, show names and chapters;
+    # make sure each case is actually covered
+    assert df['master_metadata_track_name'].notna().any()
+    assert (df['master_metadata_track_name'].notna() & df['master_metadata_album_artist_name'].isna()).any()
+    assert (df['master_metadata_track_name'].notna() & df['master_metadata_album_album_name'].isna()).any()
+    assert (df['audiobook_title'].notna() & df['audiobook_chapter_title'].isna()).any()
+    assert_same(df)
+
+def test_shuffled_index():
+    df = pd.DataFrame(EDGE_CASES * 3).sample(frac=1, random_state=0)
+    assert_same(df)
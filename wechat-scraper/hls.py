@@ -0,0 +1,194 @@
+import os
+import re
+import shutil
+import asyncio
+import http.client
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+# Segment downloads in flight at once, per video
+SEGMENT_WORKERS = 8
+# Extra attempts for a segment before the whole video counts as failed
+SEGMENT_RETRIES = 3
+# Seconds to wait on a single request
+TIMEOUT = 30
+
+ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+URI_RE = re.compile(r'URI="([^"]*)"')
+
+def parse_attributes(text):
+    """
+    Parse an attribute list like 'METHOD=AES-128,URI="key.bin",IV=0x1'.
+    """
+    return {name: value.strip('"') for name, value in ATTRIBUTE_RE.findall(text)}
+
+def fetch(url, timeout=TIMEOUT):
+    """
+    GET url and return the body. Truncated or garbled responses
+    (http.client.HTTPException, e.g. IncompleteRead) are raised as
+    OSError, like every other network failure.
+    """
+    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read()
+    except http.client.HTTPException as e:
+        raise OSError(f"{url}: {e!r}") from e
+
+def pick_variant(text, base_url):
+    """
+    For a master playlist, return the URL of the variant with the highest
+    bandwidth; for a media playlist, None.
+    """
+    best = None
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            bandwidth = int(parse_attributes(line.split(':', 1)[1]).get('BANDWIDTH', 0))
+            uri = next((l.strip() for l in lines[i + 1:] if l.strip() and not l.startswith('#')), None)
+            if uri and (best is None or bandwidth > best[0]):
+                best = (bandwidth, urljoin(base_url, uri))
+    return best[1] if best else None
+
+def localize(text, base_url):
+    """
+    Rewrite a media playlist to point at local files.
+    Returns (playlist, downloads, durations): the local playlist text,
+    (url, file name) pairs for every segment, key and init section it
+    needs, and each segment's duration keyed by file name. Keys and
+    segments keep their EXT-X-KEY lines, so the local ffmpeg run does the
+    AES-128 decryption.
+    """
+    playlist = []
+    downloads = []
+    durations = {}
+    local_names = {}
+    duration = 0.0
+
+    def local(uri, prefix, ext):
+        url = urljoin(base_url, uri)
+        if url not in local_names:
+            local_names[url] = f"{prefix}{len(local_names):05d}{ext}"
+            downloads.append((url, local_names[url]))
+        return local_names[url]
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-BYTERANGE'):
+            raise ValueError('byte-range playlists are not supported, use --engine ffmpeg')
+        if line.startswith('#EXT-X-KEY:') or line.startswith('#EXT-X-MAP:'):
+            attributes = parse_attributes(line.split(':', 1)[1])
+            if attributes.get('METHOD') not in (None, 'NONE', 'AES-128'):
+                raise ValueError(f"{attributes['METHOD']} encryption is not supported, use --engine ffmpeg")
+            if 'URI' in attributes:
+                prefix, ext = ('key', '.key') if line.startswith('#EXT-X-KEY') else ('init', '.mp4')
+                name = local(attributes['URI'], prefix, ext)
+                line = URI_RE.sub(f'URI="{name}"', line)
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',')[0])
+        elif not line.startswith('#'):
+            line = local(line, 'seg', '.ts')
+            durations[line] = duration
+        playlist.append(line)
+    return '\n'.join(playlist) + '\n', downloads, durations
+
+async def fetch_all(downloads, directory, report, durations, workers, retries):
+    """
+    Fetch every (url, name) into directory, workers at a time. Files that
+    are already there from an earlier run are kept; each download goes
+    to a .tmp file first, so only complete files count. Raises OSError
+    for a file that still fails after its retries.
+    """
+    loop = asyncio.get_running_loop()
+    done = {'seconds': 0.0, 'bytes': 0}
+    limit = asyncio.Semaphore(workers)
+
+    def count(name, size):
+        done['seconds'] += durations.get(name, 0.0)
+        done['bytes'] += size
+        report('progress', (done['seconds'], done['bytes']))
+
+    async def get(pool, url, name):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            count(name, os.path.getsize(path))
+            return
+        async with limit:
+            for attempt in range(retries + 1):
+                try:
+                    data = await loop.run_in_executor(pool, fetch, url)
+                    break
+                except OSError:
+                    if attempt == retries:
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        count(name, len(data))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tasks = [asyncio.create_task(get(pool, url, name)) for url, name in downloads]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+async def download(url, output_file, report, workers=SEGMENT_WORKERS, retries=SEGMENT_RETRIES):
+    """
+    Download an HLS stream to output_file: fetch the playlist (picking
+    the best variant of a master playlist), fetch all segments in
+    parallel into a L{n}.segments directory, and remux them with one
+    local ffmpeg run. An interrupted download keeps its segments and
+    picks up from there. report(kind, value) gets 'duration' and
+    'progress' updates like download_with_progress sends. Returns
+    ffmpeg's return code.
+    """
+    text = (await asyncio.to_thread(fetch, url)).decode()
+    variant = pick_variant(text, url)
+    if variant:
+        url = variant
+        text = (await asyncio.to_thread(fetch, url)).decode()
+    playlist, downloads, durations = localize(text, url)
+    report('duration', sum(durations.values()))
+
+    # Segments saved for a different playlist can't be reused
+    directory = output_file[:-len('.mp4')] + '.segments'
+    playlist_file = os.path.join(directory, 'index.m3u8')
+    if os.path.exists(playlist_file):
+        with open(playlist_file) as f:
+            if f.read() != playlist:
+                shutil.rmtree(directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(playlist_file, 'w') as f:
+        f.write(playlist)
+
+    await fetch_all(downloads, directory, report, durations, workers, retries)
+
+    part_file = output_file[:-len('.mp4')] + '.part.mp4'
+    cmd = [
+        'ffmpeg',
+        '-allowed_extensions', 'ALL',
+        '-protocol_whitelist', 'file,crypto',
+        '-i', playlist_file,
+        '-c', 'copy',
+        part_file,
+        '-y',
+        '-loglevel', 'quiet'
+    ]
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    await process.communicate()
+    if process.returncode == 0:
+        os.replace(part_file, output_file)
+        shutil.rmtree(directory)
+    return process.returncode
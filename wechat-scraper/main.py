@@ -1,104 +1,300 @@
+import argparse
+import functools
+import json
+import os
+import re
 import time
 import asyncio
 
-async def get_duration(url):
+import hls
+
+# How many ffmpeg processes run at once
+WORKERS = 3
+# Extra attempts for a video that fails before it is left for the next run
+RETRIES = 2
+# Which videos are done, so a re-run only downloads what is left
+MANIFEST = 'manifest.json'
+# Seconds between redraws of the progress lines
+REDRAW_INTERVAL = 0.1
+
+# ffmpeg's description of the input on stderr, e.g. "Duration: 00:45:12.34,"
+DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+
+def show(index, total, text):
     """
-    Retrieve total duration (in seconds) using ffprobe.
-    Returns None if duration cannot be determined.
+    Rewrite the status line of one video; lines are printed for every
+    video up front, in order, so video `index` is `total - index + 1`
+    lines above the cursor.
     """
-    cmd = [
-        'ffprobe',
-        '-v', 'error',
-        '-select_streams', 'v:0',
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        url
-    ]
-    try:
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        output, _ = await proc.communicate()
-        return float(output.decode().strip())
-    except Exception:
-        return None
-
-async def download_with_progress(url, index, total):
+    up = total - index + 1
+    print(f"\033[{up}A\r\033[KVideo {index}/{total} {text}\033[{up}B\r", end='', flush=True)
+
+def progress_text(duration, current_time, size):
+    bar_length = 30
+    if duration and duration > 0:
+        progress = min(current_time / duration, 1.0)
+        filled_length = int(bar_length * progress)
+        bar = '=' * filled_length + '-' * (bar_length - filled_length)
+        percentage = progress * 100
+        return f"[{bar}] {percentage:5.2f}% {size / 1e6:7.1f} MB"
+    return f"Elapsed: {current_time:5.1f}s {size / 1e6:7.1f} MB"
+
+async def render(progress, total, interval=REDRAW_INTERVAL):
+    """
+    The only writer to the terminal while downloads run. Downloads put
+    (index, kind, value) updates on the progress queue, where kind is
+    'duration', 'progress' with (seconds done, bytes written) or
+    'status' with a message. This keeps the latest state of each video
+    and redraws the lines that changed at most once per interval.
+    A None update stops it.
+    """
+    durations = {}
+    lines = {}
+    while True:
+        update = await progress.get()
+        changed = set()
+        while update is not None:
+            index, kind, value = update
+            if kind == 'duration':
+                durations[index] = value
+            else:
+                lines[index] = value
+                changed.add(index)
+            if progress.empty():
+                break
+            update = progress.get_nowait()
+
+        for index in sorted(changed):
+            line = lines[index]
+            if not isinstance(line, str):
+                line = progress_text(durations.get(index), *line)
+            show(index, total, line)
+        if update is None:
+            return
+        await asyncio.sleep(interval)
+
+async def read_duration(stderr, index, progress):
+    """
+    Pick the input's duration out of ffmpeg's log, instead of asking
+    ffprobe for it first. The rest of the log is read and dropped so
+    the pipe never fills up.
+    """
+    async for line in stderr:
+        match = DURATION_RE.search(line.decode(errors='replace'))
+        if match:
+            hours, minutes, seconds = match.groups()
+            progress.put_nowait((index, 'duration', int(hours) * 3600 + int(minutes) * 60 + float(seconds)))
+            break
+    async for line in stderr:
+        pass
+
+async def download_with_progress(url, index, output_file, progress):
     """
     Download a single HLS stream using ffmpeg,
-    updating the progress on one single line.
+    sending its progress to the progress queue.
+    Writes to a .part file first, so output_file only ever holds a
+    finished video. Returns ffmpeg's return code.
     """
-    # Try to get total duration for progress calculations.
-    duration = await get_duration(url)
-    output_file = f"L{index+10}.mp4"
+    part_file = output_file[:-len('.mp4')] + '.part.mp4'
     cmd = [
         'ffmpeg',
         '-allowed_extensions', 'ALL',
         '-i', url,
         '-c', 'copy',
-        output_file,
+        part_file,
         '-y',                   # Overwrite existing file
         '-progress', 'pipe:1',  # Write progress info to stdout
         '-nostats',             # Suppress ffmpeg's stats
-        '-loglevel', 'quiet'    # Suppress extra logs
+        '-hide_banner',
+        '-loglevel', 'info'     # Input info, for the duration
     ]
-    
-    print(f"Video {index}/{total} → {output_file}")
+
     process = await asyncio.create_subprocess_exec(
         *cmd,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE
     )
-    
+    stderr_task = asyncio.create_task(read_duration(process.stderr, index, progress))
+
     current_time = 0.0
-    bar_length = 30
-    
-    while True:
-        line = await process.stdout.readline()
-        if not line:
-            if process.returncode is not None:
-                break
-            await asyncio.sleep(0.05)
-            continue
+    size = 0
 
+    # readline() returns b'' only once ffmpeg has closed stdout
+    async for line in process.stdout:
         line = line.decode().strip()
         if line.startswith("out_time_ms="):
             # Extract current processed time in seconds
             ms_str = line.split('=')[1]
-            current_time = float(ms_str) / 1_000_000.0
-
-            if duration and duration > 0:
-                progress = min(current_time / duration, 1.0)
-                filled_length = int(bar_length * progress)
-                bar = '=' * filled_length + '-' * (bar_length - filled_length)
-                percentage = progress * 100
-                print(f"\033[{index}A\033[KVideo {index}/{total} [{bar}] {percentage:5.2f}%\033[{index}B", end='', flush=True)
-            else:
-                print(f"\033[{index}A\033[KVideo {index}/{total} Elapsed: {current_time:5.1f}s\033[{index}B", end='', flush=True)
-
-        elif line.startswith("progress=") and line == "progress=end":
-            break
+            if ms_str.isdigit():
+                current_time = float(ms_str) / 1_000_000.0
+        elif line.startswith("total_size="):
+            size_str = line.split('=')[1]
+            if size_str.isdigit():
+                size = int(size_str)
+        elif line.startswith("progress="):
+            # End of one progress block
+            progress.put_nowait((index, 'progress', (current_time, size)))
 
+    await stderr_task
     await process.wait()
-    # Finish the progress line and print a completion message.
     if process.returncode == 0:
-        print(f"\033[{index}A\033[KVideo {index}/{total} completed successfully!\033[{index}B")
-    else:
-        print(f"\033[{index}A\033[KVideo {index}/{total} failed with return code {process.returncode}\033[{index}B")
+        os.replace(part_file, output_file)
+    return process.returncode
+
+async def download_segments(url, index, output_file, progress, workers=hls.SEGMENT_WORKERS):
+    """
+    Same as download_with_progress, but fetches the segments itself,
+    several at a time, and only uses ffmpeg to remux them.
+    """
+    def report(kind, value):
+        progress.put_nowait((index, kind, value))
+    return await hls.download(url, output_file, report, workers=workers)
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    # Write a new file and swap it in, so an interrupted run can't leave
+    # half a manifest behind
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+async def run_job(job, progress, manifest, manifest_path, retries, download):
+    """
+    Download one video, retrying failures with a growing pause, and
+    record the outcome in the manifest.
+    """
+    index, url, output_file = job
+    entry = manifest.setdefault(output_file, {'attempts': 0})
+    entry['url'] = url
+
+    for attempt in range(retries + 1):
+        if attempt:
+            progress.put_nowait((index, 'status', f"failed, retrying ({attempt}/{retries})..."))
+            await asyncio.sleep(2 ** attempt)
+        progress.put_nowait((index, 'status', "starting..."))
+        entry['status'] = 'running'
+        entry['attempts'] += 1
+        save_manifest(manifest_path, manifest)
+
+        start_time = time.time()
+        try:
+            returncode = await download(url, index, output_file, progress)
+        except (OSError, ValueError) as e:
+            # ffmpeg missing, segment that won't download, disk full...
+            returncode = e
+        if returncode == 0:
+            entry.update(status='done', seconds=time.time() - start_time, bytes=os.path.getsize(output_file))
+            entry.pop('error', None)
+            save_manifest(manifest_path, manifest)
+            progress.put_nowait((index, 'status', "completed successfully!"))
+            return True
+        entry.update(status='failed', error=f"ffmpeg exited with {returncode}" if isinstance(returncode, int) else str(returncode))
+
+    save_manifest(manifest_path, manifest)
+    progress.put_nowait((index, 'status', f"failed: {entry['error']}"))
+    return False
+
+async def worker(queue, progress, manifest, manifest_path, retries, download):
+    while True:
+        job = await queue.get()
+        try:
+            await run_job(job, progress, manifest, manifest_path, retries, download)
+        except Exception as e:
+            # A failure run_job doesn't expect still only fails this video;
+            # the worker goes on with the next one, so queue.join() returns
+            index, url, output_file = job
+            entry = manifest.setdefault(output_file, {'attempts': 0, 'url': url})
+            entry.update(status='failed', error=repr(e))
+            save_manifest(manifest_path, manifest)
+            progress.put_nowait((index, 'status', f"failed: {entry['error']}"))
+        finally:
+            queue.task_done()
+
+def print_summary(manifest, done_now, wall_time):
+    """
+    Time and size of the videos downloaded by this run, and overall MB/s.
+    """
+    total_bytes = 0
+    print()
+    for output_file in done_now:
+        entry = manifest[output_file]
+        total_bytes += entry['bytes']
+        print(f"{output_file}: {entry['bytes'] / 1e6:8.1f} MB in {entry['seconds']:6.1f}s "
+              f"({entry['bytes'] / 1e6 / entry['seconds']:.2f} MB/s)")
+    failed = [name for name, entry in manifest.items() if entry['status'] != 'done']
+    if done_now:
+        print(f"Downloaded {len(done_now)} videos, {total_bytes / 1e6:.1f} MB at "
+              f"{total_bytes / 1e6 / wall_time:.2f} MB/s, {wall_time / len(done_now):.1f}s per video")
+    if failed:
+        print(f"Failed: {', '.join(failed)}; run again to retry them")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Download HLS lecture videos to mp4 with ffmpeg.')
+    parser.add_argument('--urls', metavar='FILE',
+                        help='file with one m3u8 URL per line, instead of the list in main()')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'videos downloaded at once (default {WORKERS})')
+    parser.add_argument('--retries', type=int, default=RETRIES,
+                        help=f'extra attempts per video (default {RETRIES})')
+    parser.add_argument('--engine', choices=['ffmpeg', 'native'], default='ffmpeg',
+                        help="'ffmpeg' streams each video through one ffmpeg process; 'native' fetches "
+                             "segments in parallel and remuxes them with ffmpeg (resumes per segment)")
+    parser.add_argument('--segment-workers', type=int, default=hls.SEGMENT_WORKERS,
+                        help=f'segments fetched at once per video with --engine native (default {hls.SEGMENT_WORKERS})')
+    parser.add_argument('--manifest', default=MANIFEST,
+                        help=f'progress file; finished videos listed in it are skipped (default {MANIFEST})')
+    return parser.parse_args()
 
 async def main():
+    args = parse_args()
     start_time = time.time()
     # List of HLS URLs (m3u8 links)
     urls = [
-        "https://txvodkey125.ckjrio.com/ab85ad06vodtranssgp1252433846/8ecd11ce1397757903281341694/v.f100230.m3u8?t=67edb23a&us=ZDtcpfPglJ&sign=9e3b5119724d04afc98b913e5d4ddeea"        
+        "https://txvodkey125.ckjrio.com/ab85ad06vodtranssgp1252433846/8ecd11ce1397757903281341694/v.f100230.m3u8?t=67edb23a&us=ZDtcpfPglJ&sign=9e3b5119724d04afc98b913e5d4ddeea"
         # Add more URLs as needed...
     ]
+    if args.urls:
+        with open(args.urls) as f:
+            urls = [line.strip() for line in f if line.strip()]
     total_videos = len(urls)
-    tasks = [download_with_progress(url, i, total_videos) for i, url in enumerate(urls, start=1)]
-    await asyncio.gather(*tasks)
+    manifest = load_manifest(args.manifest)
+
+    # One status line per video, then queue the ones not downloaded yet.
+    # The signed URLs change between runs, so videos are tracked by file.
+    pending = []
+    queue = asyncio.Queue()
+    for i, url in enumerate(urls, start=1):
+        output_file = f"L{i+10}.mp4"
+        entry = manifest.get(output_file)
+        if entry and entry['status'] == 'done' and os.path.exists(output_file):
+            print(f"Video {i}/{total_videos} → {output_file} already downloaded")
+        else:
+            print(f"Video {i}/{total_videos} → {output_file}")
+            queue.put_nowait((i, url, output_file))
+            pending.append(output_file)
+
+    if args.engine == 'native':
+        download = functools.partial(download_segments, workers=args.segment_workers)
+    else:
+        download = download_with_progress
+
+    progress = asyncio.Queue()
+    renderer = asyncio.create_task(render(progress, total_videos))
+    workers = [asyncio.create_task(worker(queue, progress, manifest, args.manifest, args.retries, download))
+               for _ in range(min(args.workers, len(pending)))]
+    await queue.join()
+    for task in workers:
+        task.cancel()
+    progress.put_nowait(None)
+    await renderer
+
     end_time = time.time()
+    print_summary(manifest, [name for name in pending if manifest[name]['status'] == 'done'], end_time - start_time)
     print(f"\nTotal download time: {end_time - start_time:.2f} seconds")
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+def encrypt(key, iv, data):
+    padder = padding.PKCS7(128).padder()
+    data = padder.update(data) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+    return encryptor.update(data) + encryptor.finalize()
+
+def decrypt(key, iv, data):
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+    unpadder = padding.PKCS7(128).unpadder()
+    return unpadder.update(decryptor.update(data) + decryptor.finalize()) + unpadder.finalize()
+
+class HLSServer:
+    """
+    Serves a generated HLS stream on 127.0.0.1: a master playlist with a
+    low and a high variant, and the high variant's segments encrypted
+    with AES-128 under two keys, the first with an explicit IV and the
+    second with IVs taken from the media sequence number.
+
+    failures maps a path to how many times it answers 503 before working;
+    truncated holds paths whose body is cut off after half the bytes
+    (an IncompleteRead for the client).
+    """
+    def __init__(self, segments=12, segment_size=20_000, media_sequence=7, seed=1):
+        rng = random.Random(seed)
+        self.plain = [rng.randbytes(segment_size) for _ in range(segments)]
+        self.keys = [rng.randbytes(16), rng.randbytes(16)]
+        first_iv = rng.randbytes(16)
+        self.failures = {}
+        self.truncated = set()
+        self.hits = {}
+        self.lock = threading.Lock()
+
+        self.files = {}
+        half = segments // 2
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4',
+                 f'#EXT-X-MEDIA-SEQUENCE:{media_sequence}', '#EXT-X-PLAYLIST-TYPE:VOD']
+        for i, data in enumerate(self.plain):
+            if i == 0:
+                lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="../keys/k0?token=a,b",IV=0x{first_iv.hex()}')
+            if i == half:
+                lines.append('#EXT-X-KEY:METHOD=AES-128,URI="/keys/k1?token=a"')
+            iv = first_iv if i < half else (media_sequence + i).to_bytes(16, 'big')
+            self.files[f'/hi/seg{i}.ts'] = encrypt(self.keys[i >= half], iv, data)
+            lines += ['#EXTINF:4.000,', f'seg{i}.ts?sign=xyz']
+        lines.append('#EXT-X-ENDLIST')
+        self.files['/hi/index.m3u8'] = ('\n'.join(lines) + '\n').encode()
+        self.files['/keys/k0'] = self.keys[0]
+        self.files['/keys/k1'] = self.keys[1]
+        self.files['/lo/index.m3u8'] = b'#EXTM3U\n#EXTINF:4,\nlow.ts\n#EXT-X-ENDLIST\n'
+        self.files['/master.m3u8'] = (
+            '#EXTM3U\n'
+            '#EXT-X-STREAM-INF:BANDWIDTH=500000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2"\nlo/index.m3u8\n'
+            '#EXT-X-STREAM-INF:BANDWIDTH=2000000,RESOLUTION=1280x720\nhi/index.m3u8?t=1\n'
+        ).encode()
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/master.m3u8'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                with server.lock:
+                    server.hits[path] = server.hits.get(path, 0) + 1
+                    failing = server.failures.get(path, 0) > 0
+                    if failing:
+                        server.failures[path] -= 1
+                body = server.files.get(path)
+                if failing or body is None:
+                    self.send_response(503 if failing else 404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if path in server.truncated:
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                else:
+                    self.wfile.write(body)
+
+        return Handler
+
+    def segment_hits(self):
+        return sum(n for path, n in self.hits.items() if path.endswith('.ts'))
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import re
+
+import pytest
+
+pytest.importorskip('cryptography')
+
+import hls
+import main
+from hls_server import HLSServer, decrypt
+
+@pytest.fixture
+def server():
+    server = HLSServer()
+    yield server
+    server.close()
+
+class FakeRemux:
+    """
+    Stands in for the ffmpeg remux: decrypts the local playlist's segments
+    with their keys and IVs and concatenates them, like ffmpeg would.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, *cmd, **kwargs):
+        self.calls += 1
+        playlist = cmd[cmd.index('-i') + 1]
+        output = cmd[cmd.index('copy') + 1]
+        directory = os.path.dirname(playlist)
+        key = iv = None
+        sequence = 0
+        with open(playlist) as f, open(output, 'wb') as out:
+            for line in f.read().splitlines():
+                if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+                    sequence = int(line.split(':')[1])
+                elif line.startswith('#EXT-X-KEY:'):
+                    attributes = hls.parse_attributes(line.split(':', 1)[1])
+                    with open(os.path.join(directory, attributes['URI']), 'rb') as k:
+                        key = k.read()
+                    iv = bytes.fromhex(attributes['IV'][2:]) if 'IV' in attributes else None
+                elif not line.startswith('#'):
+                    with open(os.path.join(directory, line), 'rb') as s:
+                        data = s.read()
+                    out.write(decrypt(key, iv or sequence.to_bytes(16, 'big'), data))
+                    sequence += 1
+        return self
+
+    async def communicate(self):
+        return None, None
+
+    returncode = 0
+
+@pytest.fixture
+def remux(monkeypatch):
+    remux = FakeRemux()
+    monkeypatch.setattr(hls.asyncio, 'create_subprocess_exec', remux)
+    return remux
+
+def download(server, output_file, **kwargs):
+    updates = []
+    returncode = asyncio.run(hls.download(server.url, str(output_file), lambda *update: updates.append(update), **kwargs))
+    return returncode, updates
+
+def test_localize_rewrites_keys_and_segments(server):
+    text = server.files['/hi/index.m3u8'].decode()
+    playlist, downloads, durations = hls.localize(text, server.url.replace('master.m3u8', 'hi/index.m3u8?t=1'))
+    assert [name for _, name in downloads[:2]] == ['key00000.key', 'seg00001.ts']
+    assert len(downloads) == len(server.plain) + 2
+    assert all(url.startswith('http://127.0.0.1:') for url, _ in downloads)
+    assert sum(durations.values()) == 4.0 * len(server.plain)
+    assert re.findall(r'URI="([^"]*)"', playlist) == ['key00000.key', 'key00007.key']
+    assert 'sign=' not in playlist
+
+def test_download_decrypts_stream(server, remux, tmp_path):
+    output_file = tmp_path / 'L11.mp4'
+    returncode, updates = download(server, output_file, workers=4)
+    assert returncode == 0
+    assert output_file.read_bytes() == b''.join(server.plain)
+    assert not (tmp_path / 'L11.segments').exists()
+    assert updates[0] == ('duration', 48.0)
+    assert updates[-1][0] == 'progress' and updates[-1][1][0] == 48.0
+    # the highest-bandwidth variant only, each segment once
+    assert server.hits.get('/lo/index.m3u8') is None
+    assert server.segment_hits() == len(server.plain)
+
+def test_flaky_segments_are_retried(server, remux, tmp_path, monkeypatch):
+    monkeypatch.setattr(hls.asyncio, 'sleep', no_sleep)
+    server.failures = {'/hi/seg3.ts': 2, '/keys/k1': 1}
+    output_file = tmp_path / 'L11.mp4'
+    returncode, _ = download(server, output_file, retries=2)
+    assert returncode == 0
+    assert output_file.read_bytes() == b''.join(server.plain)
+    assert server.hits['/hi/seg3.ts'] == 3
+
+def test_truncated_segment_raises_oserror_and_resumes(server, remux, tmp_path, monkeypatch):
+    monkeypatch.setattr(hls.asyncio, 'sleep', no_sleep)
+    server.truncated = {'/hi/seg5.ts'}
+    output_file = tmp_path / 'L11.mp4'
+    with pytest.raises(OSError, match='IncompleteRead'):
+        download(server, output_file, retries=1)
+    assert server.hits['/hi/seg5.ts'] == 2
+    assert not output_file.exists()
+    assert remux.calls == 0
+    # seg5.ts is the sixth download, after the first key
+    kept = os.listdir(tmp_path / 'L11.segments')
+    assert 'seg00006.ts' not in kept and not any(name.endswith('.tmp') for name in kept)
+
+    # the next run fetches only what is missing
+    server.truncated = set()
+    before = server.segment_hits()
+    returncode, _ = download(server, output_file)
+    assert returncode == 0
+    assert output_file.read_bytes() == b''.join(server.plain)
+    assert server.segment_hits() - before == len(server.plain) - sum(name.endswith('.ts') for name in kept)
+
+async def no_sleep(seconds):
+    pass
+
+def run_queue(jobs, download, tmp_path, retries=0):
+    """
+    Run jobs through main.worker the way main() does; returns the manifest.
+    """
+    manifest = {}
+    manifest_path = str(tmp_path / 'manifest.json')
+
+    async def run():
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        progress = asyncio.Queue()
+        workers = [asyncio.create_task(main.worker(queue, progress, manifest, manifest_path, retries, download))
+                   for _ in range(2)]
+        await asyncio.wait_for(queue.join(), 10)
+        for task in workers:
+            task.cancel()
+
+    asyncio.run(run())
+    assert main.load_manifest(manifest_path) == manifest
+    return manifest
+
+def test_failed_segment_fails_only_its_video(remux, tmp_path, monkeypatch):
+    monkeypatch.setattr(hls.asyncio, 'sleep', no_sleep)
+    bad = HLSServer(seed=2)
+    bad.truncated = {'/hi/seg2.ts'}
+    good = HLSServer(seed=3)
+    jobs = [(1, bad.url, str(tmp_path / 'L11.mp4')), (2, good.url, str(tmp_path / 'L12.mp4')),
+            (3, bad.url, str(tmp_path / 'L13.mp4'))]
+    try:
+        manifest = run_queue(jobs, main.download_segments, tmp_path, retries=1)
+    finally:
+        bad.close()
+        good.close()
+    assert {name: entry['status'] for name, entry in manifest.items()} == {
+        jobs[0][2]: 'failed', jobs[1][2]: 'done', jobs[2][2]: 'failed'}
+    assert 'IncompleteRead' in manifest[jobs[0][2]]['error']
+    assert manifest[jobs[0][2]]['attempts'] == 2
+
+def test_worker_survives_unexpected_errors(tmp_path):
+    async def broken(url, index, output_file, progress):
+        if index == 1:
+            raise RuntimeError('unexpected')
+        with open(output_file, 'wb') as f:
+            f.write(b'video')
+        return 0
+
+    jobs = [(i, f'http://example.invalid/{i}.m3u8', str(tmp_path / f'L{i + 10}.mp4')) for i in (1, 2, 3)]
+    manifest = run_queue(jobs, broken, tmp_path)
+    assert manifest[jobs[0][2]]['status'] == 'failed'
+    assert manifest[jobs[0][2]]['error'] == "RuntimeError('unexpected')"
+    assert [manifest[job[2]]['status'] for job in jobs[1:]] == ['done', 'done']